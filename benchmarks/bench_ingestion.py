@@ -0,0 +1,95 @@
+# benchmarks/bench_ingestion.py
+"""
+Compara a leitura "ingênua" (pd.read_csv do arquivo inteiro) com a leitura
+tipada e com poda de colunas de data_ingestion.reader, e com a leitura
+a partir do staging colunar (data_ingestion.staging, cache já aquecido).
+
+Cada variante roda num subprocesso novo, para que o pico de memória (ru_maxrss)
+de uma não contamine a outra.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_ingestion [results] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from instrumentation.metrics import peak_rss_kb
+
+VARIANTS = ["pandas_read_csv", "reader_c", "reader_pyarrow", "staging"]
+
+def run_variant(variant, dataset, repeat):
+    """Executa uma variante de leitura no processo atual e retorna as medições."""
+    import pandas as pd
+    from data_ingestion import reader
+
+    file_path = reader.get_dataset_path(dataset)
+    if variant == "pandas_read_csv":
+        read = lambda: pd.read_csv(file_path)
+    elif variant == "reader_c":
+        read = lambda: reader.parse_csv(dataset, file_path, engine="c")
+    elif reader.resolve_engine("pyarrow") != "pyarrow":
+        return {"variant": variant, "skipped": "pyarrow não instalado"}
+    elif variant == "reader_pyarrow":
+        read = lambda: reader.parse_csv(dataset, file_path, engine="pyarrow")
+    else:
+        from data_ingestion import staging
+        staging.read_staged(dataset, file_path) # Aquece o cache antes de medir
+        read = lambda: staging.read_staged(dataset, file_path)
+
+    rss_before = peak_rss_kb()
+    timings = []
+    df = None
+    for _ in range(repeat):
+        del df
+        start = time.perf_counter()
+        df = read()
+        timings.append(time.perf_counter() - start)
+    rss_after = peak_rss_kb()
+
+    return {
+        "variant": variant,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "best_s": min(timings),
+        "mean_s": sum(timings) / len(timings),
+        "df_memory_bytes": int(df.memory_usage(deep=True).sum()),
+        "peak_rss_delta_kb": (rss_after - rss_before) if rss_before is not None else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da camada de ingestão de CSVs.")
+    parser.add_argument("dataset", nargs="?", default="results")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS) # uso interno (subprocesso)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.dataset, args.repeat)))
+        return
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ingestion", args.dataset,
+             "--repeat", str(args.repeat), "--variant", variant],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n--- Ingestão de '{args.dataset}.csv' (melhor de {args.repeat}) ---")
+    print(f"{'variante':<18}{'linhas':>9}{'colunas':>9}{'tempo (ms)':>12}{'DataFrame (KB)':>16}{'pico RSS (KB)':>15}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['variant']:<18}  ignorada: {r['skipped']}")
+            continue
+        rss = r["peak_rss_delta_kb"] if r["peak_rss_delta_kb"] is not None else "-"
+        print(f"{r['variant']:<18}{r['rows']:>9}{r['columns']:>9}{r['best_s'] * 1000:>12.1f}"
+              f"{r['df_memory_bytes'] // 1024:>16}{rss:>15}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# benchmarks/bench_scaling.py
+"""
+Mede como cada etapa do ETL escala com o volume de dados: gera CSVs sintéticos
+de constructors/drivers/races/results a 1x, 10x, 100x e 1000x o tamanho da amostra
+do Ergast em extracao/ e cronometra o parse, cada transform_*_df e a carga de cada
+tabela (mais a compactação dos tipos, a validação, o truncate e o recálculo das tabelas de resumo), no SQLite e num
+PostgreSQL local.
+
+Os CSVs sintéticos são cópias da amostra com os ids deslocados a cada réplica,
+de modo que os esquemas, as chaves estrangeiras e os nulos '\\N' continuam
+exatamente como nos arquivos reais.
+
+Cada combinação (escala, banco) roda num subprocesso novo, para que o pico de
+memória (ru_maxrss) de uma não contamine a outra. O resultado é gravado em JSON;
+com --baseline, as vazões são comparadas com as de uma execução anterior.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_scaling [--scales 1 10 100] [--db sqlite postgresql]
+        [--postgres-url postgresql+psycopg2://...] [--output resultado.json] [--baseline anterior.json]
+
+ATENÇÃO: as tabelas do banco PostgreSQL informado são recriadas (sql_scripts/create_tables.sql).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from instrumentation.metrics import peak_rss_kb
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "f1_bench_scaling")
+
+# Colunas de id deslocadas a cada réplica (nome canônico do esquema do reader)
+ID_COLUMNS = {
+    "constructors": ["constructorId"],
+    "drivers": ["driverId"],
+    "races": ["raceId"],
+    "results": ["resultId", "raceId", "driverId", "constructorId"],
+}
+
+def generate_dataset(name, scale, source_dir, target_dir):
+    """
+    Gera '<name>.csv' com 'scale' réplicas do arquivo de origem, uma réplica por vez
+    (a memória usada não depende da escala). Os valores são copiados como texto,
+    preservando '\\N'; só os ids são deslocados.
+    """
+    import pandas as pd
+    from data_ingestion import reader
+
+    source_path = reader.get_dataset_path(name, source_dir)
+    target_path = reader.get_dataset_path(name, target_dir)
+    source = pd.read_csv(source_path, dtype=str, keep_default_na=False, na_filter=False)
+    aliases = reader.DATASET_SCHEMAS.get(name, {}).get("aliases", {})
+    # Nome da coluna no arquivo para cada id (o cabeçalho pode usar um alias, ex: 'raceld')
+    file_columns = {aliases.get(col, col): col for col in source.columns}
+    id_values = {col: source[file_columns[col]].astype("int64") for col in ID_COLUMNS[name]}
+    # Deslocamento de cada id por réplica: o maior id de origem de cada entidade
+    offsets = {}
+    for dataset, columns in ID_COLUMNS.items():
+        key = columns[0]
+        if key in id_values:
+            dataset_ids = pd.read_csv(reader.get_dataset_path(dataset, source_dir), usecols=[key])[key]
+            offsets[key] = int(dataset_ids.max())
+
+    tmp_path = f"{target_path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        for replica in range(scale):
+            block = source.copy()
+            for col, values in id_values.items():
+                block[file_columns[col]] = (values + replica * offsets[col]).astype(str)
+            block.to_csv(f, index=False, header=(replica == 0))
+    os.replace(tmp_path, target_path)
+
+def ensure_scaled_data(scale, data_dir=DEFAULT_DATA_DIR, source_dir=None):
+    """Gera (se ainda não existirem) os CSVs da escala informada e retorna a pasta."""
+    from config import settings
+
+    if source_dir is None:
+        source_dir = settings.EXTRACAO_PATH
+    target_dir = os.path.join(data_dir, f"x{scale}")
+    os.makedirs(target_dir, exist_ok=True)
+    for name in ID_COLUMNS:
+        if not os.path.exists(os.path.join(target_dir, f"{name}.csv")):
+            print(f"Gerando {name}.csv em escala {scale}x...", file=sys.stderr)
+            generate_dataset(name, scale, source_dir, target_dir)
+    return target_dir
+
+def _prepare_database(db_url):
+    """Recria tabelas e tabelas de resumo (sql_scripts/) no banco de destino."""
+    from config import settings
+    from data_loading import loader
+
+    engine = loader.get_db_engine(db_url)
+    with engine.begin() as connection:
+        for script in ("create_tables.sql", "create_summary_tables.sql"):
+            loader.run_sql_script(connection, os.path.join(settings.SQL_SCRIPTS_PATH, script))
+    return engine
+
+def run_scale(scale, db_name, db_url, data_dir):
+    """Executa as etapas do ETL sobre os CSVs de uma escala no processo atual e retorna as medições."""
+    from config import settings
+    from data_ingestion import reader
+    from data_loading import loader, summaries
+    from data_transformation import compaction, transformer
+    from data_validation import validator
+
+    settings.METRICS_FORMAT = "none" # O benchmark faz as próprias medições; não grava em metrics/
+    dataset_dir = ensure_scaled_data(scale, data_dir)
+    engine = _prepare_database(db_url)
+    stages = []
+    rss_start = peak_rss_kb()
+
+    def measure(stage, func, rows=None):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        result = func()
+        seconds = time.perf_counter() - start_wall
+        row_count = rows(result) if rows else None
+        stages.append({
+            "stage": stage,
+            "seconds": seconds,
+            "cpu_seconds": time.process_time() - start_cpu,
+            "rows": row_count,
+            "rows_per_sec": (row_count / seconds) if row_count and seconds > 0 else None,
+            "peak_rss_kb": peak_rss_kb(),
+        })
+        return result
+
+    frames = {}
+    for name in settings.LOAD_ORDER:
+        path = reader.get_dataset_path(name, dataset_dir)
+        raw = measure(f"parse_{name}", lambda: reader.read_dataset(name, path, use_staging=False), len)
+        frames[name] = measure(f"transform_{name}", lambda: transformer.TRANSFORMS[name](raw), len)
+        del raw
+        if settings.COMPACT_DTYPES:
+            frames[name] = measure(f"compact_{name}", lambda: compaction.compact_dtypes(frames[name]), len)
+    if settings.VALIDATION_ENABLED:
+        frames, _ = measure("validate", lambda: validator.validate_frames(frames),
+                            lambda result: sum(len(df) for df in result[0].values()))
+
+    defer_foreign_keys = settings.VALIDATION_ENABLED and settings.LOAD_DEFER_FOREIGN_KEYS
+    with loader.load_transaction(engine, defer_foreign_keys) as connection:
+        measure("truncate", lambda: loader.truncate_tables(connection, raise_errors=True))
+        for name in settings.LOAD_ORDER:
+            dtype_mapping = loader.results_dtype_mapping if name == "results" else None
+            measure(f"load_{name}", lambda: loader.load_dataframe_to_db(
+                frames[name], settings.TABLE_NAMES[name], connection,
+                dtype_mapping=dtype_mapping, raise_errors=True), lambda stats: stats["rows"])
+        measure("refresh_summaries", lambda: summaries.refresh_summaries(connection))
+    loader.dispose_engines()
+
+    rss_end = peak_rss_kb()
+    return {
+        "scale": scale,
+        "db": db_name,
+        "results_rows": len(frames["results"]),
+        "total_seconds": sum(stage["seconds"] for stage in stages),
+        "peak_rss_kb": rss_end,
+        "peak_rss_delta_kb": (rss_end - rss_start) if rss_start is not None else None,
+        "stages": stages,
+    }
+
+def _environment():
+    """Versões e commit em uso, para comparar execuções entre versões do projeto."""
+    import pandas as pd
+    import sqlalchemy
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "platform": platform.platform(),
+    }
+
+def _print_report(runs, baseline=None):
+    """Tabela por escala/banco/etapa; com baseline, a variação da vazão em relação a ela."""
+    previous = {}
+    if baseline:
+        for run in baseline["runs"]:
+            for stage in run.get("stages", []):
+                previous[(run["scale"], run["db"], stage["stage"])] = stage
+    header = f"{'escala':>7} {'banco':<11}{'etapa':<24}{'tempo (ms)':>12}{'linhas/s':>14}{'pico RSS (KB)':>15}"
+    if baseline:
+        header += f"{'vs. base':>10}"
+    print(header)
+    for run in runs:
+        if "error" in run:
+            print(f"{run['scale']:>6}x {run['db']:<11}erro: {run['error']}")
+            continue
+        for stage in run["stages"]:
+            rate = f"{stage['rows_per_sec']:,.0f}" if stage["rows_per_sec"] else "-"
+            line = (f"{run['scale']:>6}x {run['db']:<11}{stage['stage']:<24}{stage['seconds'] * 1000:>12.1f}"
+                    f"{rate:>14}{stage['peak_rss_kb'] or '-':>15}")
+            base = previous.get((run["scale"], run["db"], stage["stage"]))
+            if base and base.get("seconds"):
+                # > 0: mais lento que a base (possível regressão)
+                line += f"{(stage['seconds'] / base['seconds'] - 1) * 100:>+9.0f}%"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala do pipeline ETL com dados sintéticos.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--db", nargs="+", choices=["sqlite", "postgresql"], default=["sqlite", "postgresql"])
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"),
+                        help="Banco PostgreSQL de teste (as tabelas são recriadas). Padrão: $BENCH_POSTGRES_URL.")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Pasta dos CSVs sintéticos (reaproveitados).")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: só exibe o relatório).")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior, para comparação.")
+    parser.add_argument("--run", nargs=3, metavar=("ESCALA", "BANCO", "URL"), help=argparse.SUPPRESS) # uso interno (subprocesso)
+    args = parser.parse_args()
+
+    if args.run:
+        scale, db_name, db_url = args.run
+        print(json.dumps(run_scale(int(scale), db_name, db_url, args.data_dir)))
+        return
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in args.scales:
+            for db_name in args.db:
+                if db_name == "sqlite":
+                    db_url = f"sqlite:///{os.path.join(tmp_dir, f'bench_x{scale}.db')}"
+                elif args.postgres_url:
+                    db_url = args.postgres_url
+                else:
+                    runs.append({"scale": scale, "db": db_name, "error": "informe --postgres-url"})
+                    continue
+                print(f"Executando escala {scale}x em {db_name}...", file=sys.stderr)
+                completed = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_scaling", "--data-dir", args.data_dir,
+                     "--run", str(scale), db_name, db_url],
+                    cwd=project_root, capture_output=True, text=True,
+                )
+                if completed.returncode != 0:
+                    error = (completed.stderr.strip().splitlines() or ["falha sem mensagem"])[-1]
+                    runs.append({"scale": scale, "db": db_name, "error": error})
+                    continue
+                runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = {"environment": _environment(), "runs": runs}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(f"\n--- Escala do pipeline ETL (commit {report['environment']['git_commit'] or '?'}) ---")
+    _print_report(runs, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados gravados em '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
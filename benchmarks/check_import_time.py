@@ -0,0 +1,101 @@
+# benchmarks/check_import_time.py
+"""
+Verificação de regressão do tempo de importação dos pontos de entrada (python -X importtime).
+
+Cada módulo é importado num subprocesso novo. A verificação falha se ele carregar algum
+módulo pesado que não deveria (ex: pandas no '--help' do pipeline ou na execução só da
+extração) ou se o tempo de importação passar do limite.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.check_import_time [--max-ms 150] [--repeat 3] [--top 5]
+Sai com código 1 se alguma verificação falhar.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "sqlalchemy", "requests"]
+
+# Ponto de entrada -> módulos que ele não pode importar
+CHECKS = {
+    "config.settings": HEAVY_MODULES + ["dotenv"], # O .env só é lido no primeiro acesso a uma configuração
+    "main_etl_pipeline": HEAVY_MODULES, # '--help' e --extract-only
+    "main_data_explorer": HEAVY_MODULES, # O menu abre antes de qualquer DataFrame
+    "data_extraction.extractor": HEAVY_MODULES, # requests só no download
+}
+
+DEFAULT_MAX_MS = 150
+
+def import_profile(module, project_root):
+    """
+    Importa 'module' num processo novo com -X importtime.
+    Retorna (tempo total em µs, [(módulo, µs acumulados)] de tudo o que ele importou).
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=project_root, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"falha ao importar '{module}': {completed.stderr.strip().splitlines()[-1]}")
+
+    # Linhas em pós-ordem: os módulos importados por 'module' vêm logo antes da linha dele (nível 0)
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit(): # Cabeçalho
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    position = max(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == module)
+    start = position
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    return entries[position][2], [(name, us) for _, name, us in entries[start:position]]
+
+def check_module(module, forbidden, max_ms, repeat, project_root):
+    """Executa a verificação de um ponto de entrada (melhor de 'repeat' importações)."""
+    runs = [import_profile(module, project_root) for _ in range(repeat)]
+    total_us, imported = min(runs, key=lambda run: run[0])
+    names = {name for name, _ in imported}
+    loaded = [heavy for heavy in forbidden
+              if any(name == heavy or name.startswith(f"{heavy}.") for name in names)]
+    return {
+        "module": module,
+        "ms": total_us / 1000,
+        "forbidden_loaded": loaded,
+        "over_budget": total_us / 1000 > max_ms,
+        "slowest": sorted(imported, key=lambda item: item[1], reverse=True),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificação de regressão do tempo de importação (-X importtime).")
+    parser.add_argument("modules", nargs="*", default=list(CHECKS), help="Pontos de entrada (padrão: todos).")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS, help="Limite de tempo por ponto de entrada.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Importações mais lentas exibidas por ponto de entrada.")
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    failures = 0
+    print(f"--- Tempo de importação (melhor de {args.repeat}, limite {args.max_ms:.0f} ms) ---")
+    for module in args.modules:
+        result = check_module(module, CHECKS.get(module, HEAVY_MODULES), args.max_ms, args.repeat, project_root)
+        problems = []
+        if result["forbidden_loaded"]:
+            problems.append(f"importa {', '.join(result['forbidden_loaded'])}")
+        if result["over_budget"]:
+            problems.append("acima do limite")
+        failures += bool(problems)
+        status = "FALHOU (" + "; ".join(problems) + ")" if problems else "ok"
+        print(f"{module:<28}{result['ms']:>9.1f} ms  {status}")
+        for name, us in result["slowest"][:args.top]:
+            print(f"    {name:<40}{us / 1000:>9.1f} ms")
+
+    if failures:
+        print(f"\n{failures} ponto(s) de entrada com regressão no tempo de importação.")
+        sys.exit(1)
+    print("\nNenhuma regressão no tempo de importação.")
+
+if __name__ == "__main__":
+    main()
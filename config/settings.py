@@ -1,38 +1,20 @@
 # config/settings.py
 import os
-from dotenv import load_dotenv
-
-# Carregar variáveis de ambiente do arquivo .env
-load_dotenv()
-
-# Configurações do Banco de Dados
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5432')
-DB_NAME = os.getenv('DB_NAME', 'formula1_db')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_TYPE = os.getenv('DB_TYPE', 'postgresql') # Adicione o tipo de DB (postgresql, mysql, sqlite)
-
-# String de conexão SQLAlchemy (ajuste conforme o DB_TYPE)
-if DB_TYPE == 'postgresql':
-    DB_STRING = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-elif DB_TYPE == 'mysql':
-    DB_STRING = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-elif DB_TYPE == 'sqlite':
-    # Para SQLite, DB_NAME pode ser o caminho do arquivo, ex: 'formula1.db'
-    # Se DB_NAME for um caminho absoluto, use-o diretamente.
-    # Se for relativo, construa o caminho a partir da raiz do projeto.
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    db_file_path = os.path.join(project_root, DB_NAME)
-    DB_STRING = f"sqlite:///{db_file_path}"
-else:
-    DB_STRING = None # Ou levante um erro
+
+# Importar este módulo não tem efeito colateral: as configurações fixas (pastas, URLs, tabelas)
+# são constantes, e as que vêm do ambiente (variáveis de ambiente e arquivo .env, ver _from_environment)
+# só são resolvidas no primeiro acesso a qualquer uma delas (ver __getattr__). O .env é lido uma
+# única vez e exportado para os.environ, como antes (load_dotenv); as variáveis já definidas no
+# ambiente têm precedência sobre ele.
+# Valores atribuídos em tempo de execução (ex: settings.METRICS_FORMAT = "none") são mantidos.
 
 # Pastas
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Raiz do projeto
 EXTRACAO_FOLDER_NAME = "extracao"
 EXTRACAO_PATH = os.path.join(BASE_DIR, EXTRACAO_FOLDER_NAME)
 SQL_SCRIPTS_PATH = os.path.join(BASE_DIR, "sql_scripts")
+# Manifesto da extração (ETag/Last-Modified, tamanho, mtime e MD5 de cada arquivo), ao lado da pasta 'extracao'
+EXTRACAO_MANIFEST_PATH = f"{EXTRACAO_PATH}_manifest.json"
 
 # URLs dos arquivos CSV
 CSV_URLS = {
@@ -43,6 +25,17 @@ CSV_URLS = {
 }
 MD5_HASH_URL = "https://github.com/CaioSobreira/dti_arquivos/raw/main/arquivos_hash_md5sum.csv"
 
+CSV_NULL_VALUES = ['\\N'] # Marcador de nulo usado nos arquivos do Ergast
+
+# Cache de staging colunar (Feather/Arrow) entre extração e transformação (ver STAGING_ENABLED)
+STAGING_PATH = os.path.join(BASE_DIR, "staging")
+
+# Carga incremental: fingerprints das linhas já carregadas, por tabela
+LOAD_STATE_PATH = os.path.join(BASE_DIR, "load_state")
+
+PROFILE_CACHE_PATH = os.path.join(BASE_DIR, "profile_cache") # Perfis dos CSVs brutos, por MD5 do arquivo
+
+METRICS_PATH = os.path.join(BASE_DIR, "metrics")
 
 # Nomes das tabelas (para consistência)
 TABLE_NAMES = {
@@ -51,3 +44,153 @@ TABLE_NAMES = {
     "races": "races",
     "results": "results"
 }
+
+# Chaves primárias de cada tabela (conforme sql_scripts/create_tables.sql)
+PRIMARY_KEYS = {
+    "constructors": ["constructorId"],
+    "drivers": ["driverId"],
+    "races": ["raceId"],
+    "results": ["resultId"]
+}
+
+# Chaves estrangeiras: conjunto -> {coluna: conjunto pai} (verificadas em data_validation/validator.py)
+FOREIGN_KEYS = {
+    "results": {"raceId": "races", "driverId": "drivers", "constructorId": "constructors"}
+}
+
+# Validação antes da carga: linhas rejeitadas vão para QUARANTINE_PATH/<execução>/<tabela>.csv
+QUARANTINE_PATH = os.path.join(BASE_DIR, "quarantine")
+
+# Captura de alterações (CDC, data_loading/cdc.py): um delta por execução em CDC_PATH/<sequência>/ (ver CDC_ENABLED)
+CDC_PATH = os.path.join(BASE_DIR, "cdc")
+
+# Ordem de carga respeitando as chaves estrangeiras (results depende das demais)
+LOAD_ORDER = ["constructors", "drivers", "races", "results"]
+
+def _from_environment(getenv):
+    """
+    Configurações lidas do ambiente. 'getenv(nome, padrão)' consulta as variáveis de ambiente
+    e, na falta delas, o arquivo .env. Retorna {NOME: valor}.
+    """
+    # Configurações do Banco de Dados
+    DB_HOST = getenv('DB_HOST', 'localhost')
+    DB_PORT = getenv('DB_PORT', '5432')
+    DB_NAME = getenv('DB_NAME', 'formula1_db')
+    DB_USER = getenv('DB_USER')
+    DB_PASSWORD = getenv('DB_PASSWORD')
+    DB_TYPE = getenv('DB_TYPE', 'postgresql') # Adicione o tipo de DB (postgresql, mysql, sqlite)
+
+    # String de conexão SQLAlchemy (ajuste conforme o DB_TYPE)
+    if DB_TYPE == 'postgresql':
+        DB_STRING = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    elif DB_TYPE == 'mysql':
+        DB_STRING = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    elif DB_TYPE == 'sqlite':
+        # Para SQLite, DB_NAME pode ser o caminho do arquivo, ex: 'formula1.db'
+        # Se DB_NAME for um caminho absoluto, use-o diretamente.
+        # Se for relativo, construa o caminho a partir da raiz do projeto.
+        db_file_path = os.path.join(BASE_DIR, DB_NAME)
+        DB_STRING = f"sqlite:///{db_file_path}"
+    else:
+        DB_STRING = None # Ou levante um erro
+
+    # Download dos arquivos (extração concorrente)
+    DOWNLOAD_MAX_WORKERS = int(getenv('DOWNLOAD_MAX_WORKERS', '4')) # Tamanho do pool de workers/conexões HTTP
+    DOWNLOAD_CHUNK_SIZE = int(getenv('DOWNLOAD_CHUNK_SIZE', str(64 * 1024))) # Bytes por bloco gravado em disco
+    DOWNLOAD_TIMEOUT = int(getenv('DOWNLOAD_TIMEOUT', '30')) # Segundos
+
+    # Leitura dos CSVs: 'auto' usa o engine pyarrow quando instalado, senão o engine 'c' do pandas
+    CSV_ENGINE = getenv('CSV_ENGINE', 'auto')
+
+    # Cache de staging colunar (STAGING_PATH); requer pyarrow
+    STAGING_ENABLED = getenv('STAGING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    STAGING_MAX_BYTES = int(getenv('STAGING_MAX_BYTES', str(512 * 1024 * 1024))) # Entradas mais antigas são removidas acima disso
+
+    # Número de tarefas do pipeline (leitura/transformação/carga) executadas em paralelo
+    PIPELINE_MAX_WORKERS = int(getenv('PIPELINE_MAX_WORKERS', '4'))
+    # Execução por temporada (--years): processos de trabalho em paralelo (0 = um por núcleo de CPU)
+    PIPELINE_MAX_PROCESSES = int(getenv('PIPELINE_MAX_PROCESSES', '0'))
+
+    # Compactação dos DataFrames transformados (data_transformation/compaction.py): inteiros na menor largura,
+    # texto como categoria quando distintos/linhas <= COMPACT_CATEGORICAL_MAX_RATIO (senão string do pyarrow)
+    COMPACT_DTYPES = getenv('COMPACT_DTYPES', 'true').lower() in ('1', 'true', 'yes')
+    COMPACT_CATEGORICAL_MAX_RATIO = float(getenv('COMPACT_CATEGORICAL_MAX_RATIO', '0.5'))
+
+    # Modo streaming de results: linhas por bloco lido do CSV, transformado e carregado
+    STREAM_CHUNKSIZE = int(getenv('STREAM_CHUNKSIZE', '100000'))
+
+    # Carga no banco: linhas por bloco enviado (COPY no PostgreSQL, INSERTs em lote nos demais)
+    LOAD_CHUNKSIZE = int(getenv('LOAD_CHUNKSIZE', '10000'))
+
+    # Pool de conexões da engine (reaproveitada por todo o processo)
+    DB_POOL_SIZE = int(getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_RECYCLE = int(getenv('DB_POOL_RECYCLE', '1800')) # Segundos até uma conexão ser renovada
+    DB_POOL_PRE_PING = getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # SQLite: PRAGMA synchronous=OFF durante as cargas e modo WAL (permanente: fica gravado no arquivo do banco)
+    SQLITE_BULK_PRAGMAS = getenv('SQLITE_BULK_PRAGMAS', 'true').lower() in ('1', 'true', 'yes')
+
+    # Explorador de dados: memória máxima dos DataFrames mantidos em cache durante a sessão
+    EXPLORER_CACHE_MAX_BYTES = int(getenv('EXPLORER_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+    # Perfil das colunas (data_exploration/profiler.py): acima de PROFILE_EXACT_MAX_ROWS linhas o perfil é aproximado,
+    # com amostra de PROFILE_SAMPLE_SIZE linhas e distintos por HyperLogLog com 2**PROFILE_HLL_PRECISION registradores
+    PROFILE_EXACT_MAX_ROWS = int(getenv('PROFILE_EXACT_MAX_ROWS', '500000'))
+    PROFILE_SAMPLE_SIZE = int(getenv('PROFILE_SAMPLE_SIZE', '10000'))
+    PROFILE_HLL_PRECISION = int(getenv('PROFILE_HLL_PRECISION', '14'))
+
+    # Instrumentação das etapas (instrumentation/metrics.py), gravada em METRICS_PATH
+    # Formatos: 'jsonl', 'prometheus', ambos separados por vírgula, ou 'none' para desligar
+    METRICS_FORMAT = getenv('METRICS_FORMAT', 'jsonl')
+    METRICS_TRACEMALLOC = getenv('METRICS_TRACEMALLOC', 'false').lower() in ('1', 'true', 'yes') # Custo extra de CPU
+    METRICS_PROFILE = getenv('METRICS_PROFILE', 'false').lower() in ('1', 'true', 'yes') # Um arquivo cProfile por etapa
+
+    # Validação antes da carga (ver QUARANTINE_PATH)
+    VALIDATION_ENABLED = getenv('VALIDATION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Com os dados já validados, a carga adia (PostgreSQL/SQLite) ou desliga (MySQL) a verificação das chaves estrangeiras
+    LOAD_DEFER_FOREIGN_KEYS = getenv('LOAD_DEFER_FOREIGN_KEYS', 'true').lower() in ('1', 'true', 'yes')
+
+    # CDC: linhas inseridas/atualizadas/removidas em relação ao último delta, em Parquet (requer pyarrow)
+    CDC_ENABLED = getenv('CDC_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CDC_COMPRESSION = getenv('CDC_COMPRESSION', 'zstd') # Compressão do Parquet: zstd, snappy, gzip, none...
+
+    # Informações do ambiente (exibidas ao final do pipeline)
+    PYTHON_VERSION_USED = getenv('PYTHON_VERSION', 'não informado')
+    SGBD_NAME_USED = getenv('SGBD_NAME', DB_TYPE)
+    SGBD_VERSION_USED = getenv('SGBD_VERSION', 'não informado')
+
+    return {name: value for name, value in locals().items() if name.isupper()}
+
+_resolved = False
+
+def _environment_getenv():
+    """
+    Lê o arquivo .env (aqui, uma vez) e exporta para os.environ as variáveis que ainda não estão
+    definidas, disponíveis também para subprocessos e bibliotecas. Retorna os.getenv.
+    """
+    from dotenv import load_dotenv, find_dotenv # Import tardio: só quando uma configuração do ambiente é usada
+    load_dotenv(find_dotenv()) # Sem override: o ambiente tem precedência sobre o .env
+    return os.getenv
+
+def resolve():
+    """
+    Resolve as configurações do ambiente (uma única vez). Não é preciso chamar diretamente:
+    o primeiro acesso a uma delas resolve todas. Valores já atribuídos não são sobrescritos.
+    """
+    global _resolved
+    if _resolved:
+        return
+    for name, value in _from_environment(_environment_getenv()).items():
+        globals().setdefault(name, value)
+    _resolved = True
+
+def __getattr__(name):
+    # Chamado só para nomes ainda não definidos no módulo: configurações do ambiente não resolvidas
+    if not _resolved and name.isupper():
+        resolve()
+        if name in globals():
+            return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    resolve()
+    return sorted(globals())
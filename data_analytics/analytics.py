@@ -0,0 +1,215 @@
+# data_analytics/analytics.py
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import settings
+
+# Resultados já calculados, por consulta e hash dos DataFrames de entrada (os mais antigos saem primeiro)
+_CACHE_MAX_ENTRIES = 32
+_cache = OrderedDict()
+
+def frame_hash(df):
+    """Hash do conteúdo de um DataFrame (valores, índice e nomes das colunas)."""
+    digest = hashlib.md5(repr(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _memoized(key, compute):
+    """Devolve o resultado guardado para 'key' ou o calcula e guarda."""
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    result = compute()
+    _cache[key] = result
+    if len(_cache) > _CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return result
+
+def clear_cache():
+    """Descarta os resultados memoizados."""
+    _cache.clear()
+
+class JoinIndex:
+    """
+    Índice denso de uma tabela por chave inteira: posicao[id] = linha da tabela (-1 se o id não existe).
+    Substitui a junção do SQL por uma indexação de array, sem ordenação nem hash por consulta.
+    """
+    def __init__(self, df, key_column):
+        keys = df[key_column].to_numpy(dtype=np.int64)
+        size = int(keys.max()) + 1 if len(keys) else 0
+        self.positions = np.full(size, -1, dtype=np.int64)
+        self.positions[keys] = np.arange(len(keys))
+        self.df = df.reset_index(drop=True)
+
+    def lookup(self, ids):
+        """Posições das linhas para cada id (-1 para ids inexistentes)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        found = (ids >= 0) & (ids < len(self.positions))
+        positions = np.full(len(ids), -1, dtype=np.int64)
+        positions[found] = self.positions[ids[found]]
+        return positions
+
+    def take(self, column, positions):
+        """Valores de 'column' nas posições informadas (todas válidas)."""
+        return self.df[column].to_numpy()[positions]
+
+def build_join_indexes(frames):
+    """
+    Monta os índices de junção a partir dos DataFrames transformados:
+    raceId -> year/name/date, driverId -> fullname, constructorId -> name.
+    """
+    return {
+        "races": JoinIndex(frames["races"], "raceId"),
+        "drivers": JoinIndex(frames["drivers"], "driverId"),
+        "constructors": JoinIndex(frames["constructors"], "constructorId"),
+    }
+
+def _join_results(results, indexes):
+    """
+    Junta results às tabelas de dimensão pelos índices (equivalente aos INNER JOINs das views):
+    linhas sem corrida, piloto ou construtor correspondente são descartadas.
+    Retorna (máscara das linhas mantidas, posições em races, drivers e constructors).
+    """
+    race_pos = indexes["races"].lookup(results["raceId"])
+    driver_pos = indexes["drivers"].lookup(results["driverId"])
+    constructor_pos = indexes["constructors"].lookup(results["constructorId"])
+    keep = (race_pos >= 0) & (driver_pos >= 0) & (constructor_pos >= 0)
+    return keep, race_pos[keep], driver_pos[keep], constructor_pos[keep]
+
+def _compute_driver_yearly_results(frames):
+    results = frames["results"]
+    indexes = build_join_indexes(frames)
+    keep, race_pos, driver_pos, constructor_pos = _join_results(results, indexes)
+    joined = pd.DataFrame({
+        "ano": indexes["races"].take("year", race_pos),
+        "driver_fullname": indexes["drivers"].take("fullname", driver_pos),
+        "constructor_name": indexes["constructors"].take("name", constructor_pos),
+        "qtd_vitorias": (results["positionOrder"].to_numpy()[keep] == 1).astype(np.int64),
+        "qtd_pontos": results["points"].to_numpy()[keep],
+    })
+    yearly = joined.groupby(["ano", "driver_fullname", "constructor_name"], sort=False, dropna=False).sum()
+    return yearly.reset_index().sort_values(["ano", "driver_fullname", "constructor_name"], ignore_index=True)
+
+def _compute_grand_prix_fastest_laps(frames):
+    results = frames["results"]
+    with_lap = results[results["fastestLapTimeMs"].notna()]
+    # Linha da volta mais rápida de cada corrida (equivalente ao ROW_NUMBER() ... rn = 1 da view)
+    fastest = with_lap.loc[with_lap.groupby("raceId")["fastestLapTimeMs"].idxmin()]
+    indexes = build_join_indexes(frames)
+    keep, race_pos, driver_pos, constructor_pos = _join_results(fastest, indexes)
+    laps = pd.DataFrame({
+        "race_date": indexes["races"].take("date", race_pos),
+        "grand_prix_name": indexes["races"].take("name", race_pos),
+        "fastest_lap_time": fastest["fastestLapTime"].to_numpy()[keep],
+        "driver_fullname": indexes["drivers"].take("fullname", driver_pos),
+        "constructor_name": indexes["constructors"].take("name", constructor_pos),
+    })
+    return laps.sort_values(["race_date", "grand_prix_name"], ascending=[False, True],
+                            kind="stable", ignore_index=True)
+
+# Consultas disponíveis: nome da view de sql_scripts/create_views.sql -> (função, conjuntos usados)
+QUERIES = {
+    "view_driver_yearly_results": (_compute_driver_yearly_results,
+                                   ["results", "races", "drivers", "constructors"]),
+    "view_grand_prix_fastest_laps": (_compute_grand_prix_fastest_laps,
+                                     ["results", "races", "drivers", "constructors"]),
+}
+
+def run_query(view_name, frames):
+    """
+    Responde a uma das views de negócio direto dos DataFrames transformados, sem banco de dados.
+    'frames' é um dicionário {nome_do_conjunto: DataFrame transformado}.
+    O resultado é memoizado pelo hash dos DataFrames usados: chamadas repetidas com os mesmos
+    dados não recalculam nada. O DataFrame devolvido é compartilhado; copie-o antes de alterá-lo.
+    """
+    compute, datasets = QUERIES[view_name]
+    key = (view_name,) + tuple(frame_hash(frames[name]) for name in datasets)
+    return _memoized(key, lambda: compute(frames))
+
+def driver_yearly_results(frames):
+    """Vitórias e pontos de cada piloto/construtor por ano (view_driver_yearly_results)."""
+    return run_query("view_driver_yearly_results", frames)
+
+def grand_prix_fastest_laps(frames):
+    """Volta mais rápida de cada Grande Prêmio, com piloto e data (view_grand_prix_fastest_laps)."""
+    return run_query("view_grand_prix_fastest_laps", frames)
+
+def load_transformed_frames():
+    """Lê e transforma os quatro conjuntos de dados da pasta de extração."""
+    from data_transformation import transformer
+    return {name: transformer.transform_dataset(name) for name in settings.LOAD_ORDER}
+
+def _normalize(df):
+    """
+    Deixa resultados do SQL e do pandas comparáveis: datas como datetime, números como float
+    e linhas em ordem total (o ORDER BY das views não desempata todas as colunas).
+    """
+    normalized = df.copy()
+    for col in normalized.columns:
+        if col == "race_date":
+            normalized[col] = pd.to_datetime(normalized[col])
+        elif col in ("ano", "qtd_vitorias", "qtd_pontos"):
+            normalized[col] = normalized[col].astype(float)
+        else:
+            normalized[col] = normalized[col].astype(object).where(normalized[col].notna(), None)
+    return normalized.sort_values(list(normalized.columns), ignore_index=True)
+
+def check_parity(frames, engine):
+    """
+    Compara as respostas em memória com as views SQL do banco em 'engine',
+    que deve ter sido carregado com os mesmos DataFrames.
+    Retorna True se todas as views coincidirem; as divergências são exibidas.
+    """
+    all_equal = True
+    for view_name in QUERIES:
+        expected = _normalize(pd.read_sql(f"SELECT * FROM {view_name}", engine))
+        actual = _normalize(run_query(view_name, frames))
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+            print(f"Paridade OK: '{view_name}' ({len(actual)} linhas).")
+        except AssertionError as e:
+            all_equal = False
+            print(f"Divergência em '{view_name}': {e}")
+    return all_equal
+
+def check_parity_sqlite(frames=None):
+    """
+    Carrega os DataFrames num banco SQLite temporário, com as tabelas e views de sql_scripts/,
+    e compara as views com as respostas em memória (ver check_parity).
+    """
+    from sqlalchemy import create_engine
+    from data_loading.loader import load_dataframe_to_db, results_dtype_mapping, run_sql_script
+
+    if frames is None:
+        frames = load_transformed_frames()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, 'parity.db')}")
+        try:
+            with engine.begin() as connection:
+                run_sql_script(connection, os.path.join(settings.SQL_SCRIPTS_PATH, "create_tables.sql"))
+                run_sql_script(connection, os.path.join(settings.SQL_SCRIPTS_PATH, "create_views.sql"))
+            for name in settings.LOAD_ORDER:
+                dtype_mapping = results_dtype_mapping if name == "results" else None
+                load_dataframe_to_db(frames[name], settings.TABLE_NAMES[name], engine,
+                                     dtype_mapping=dtype_mapping, raise_errors=True)
+            return check_parity(frames, engine)
+        finally:
+            engine.dispose()
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Respostas das views de negócio calculadas em memória.")
+    parser.add_argument("--check-parity", action="store_true",
+                        help="Compara as respostas com as views SQL num banco SQLite temporário.")
+    args = parser.parse_args()
+
+    transformed_frames = load_transformed_frames()
+    if args.check_parity:
+        raise SystemExit(0 if check_parity_sqlite(transformed_frames) else 1)
+    print("\nVitórias e pontos por piloto e ano:")
+    print(driver_yearly_results(transformed_frames).head(20))
+    print("\nVolta mais rápida de cada Grande Prêmio:")
+    print(grand_prix_fastest_laps(transformed_frames).head(20))
@@ -0,0 +1,113 @@
+# data_exploration/catalog.py
+import os
+import threading
+from collections import OrderedDict
+from config import settings
+
+RAW = "raw"
+TRANSFORMED = "transformed"
+
+def _file_signature(file_path):
+    """Tamanho e mtime do CSV: mudam quando o arquivo é baixado novamente."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+class DataFrameCatalog:
+    """
+    Catálogo de DataFrames de uma sessão do explorador.
+    Cada conjunto de dados (bruto ou transformado) só é lido na primeira vez que é pedido
+    e fica guardado num cache LRU limitado a 'max_bytes' de memória: os menos usados
+    recentemente saem primeiro. Uma entrada é descartada se o CSV de origem mudar em disco.
+    A verificação de atualização dos arquivos (download) roda em segundo plano.
+    """
+
+    def __init__(self, max_bytes=None, base_path=None):
+        if max_bytes is None:
+            max_bytes = settings.EXPLORER_CACHE_MAX_BYTES
+        if base_path is None:
+            base_path = settings.EXTRACAO_PATH
+        self.max_bytes = max_bytes
+        self.base_path = base_path
+        self._entries = OrderedDict() # (nome, tipo) -> (DataFrame, bytes, assinatura do CSV)
+        self._refresh_thread = None
+        self.refresh_status = None
+
+    @property
+    def used_bytes(self):
+        return sum(nbytes for _, nbytes, _ in self._entries.values())
+
+    def start_background_refresh(self):
+        """Verifica/baixa os CSVs numa thread em segundo plano, sem bloquear o explorador."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self.refresh_status = "verificando atualizações dos arquivos em segundo plano..."
+        self._refresh_thread = threading.Thread(target=self._refresh, name="explorer-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh(self):
+        from data_extraction import extractor # Import tardio: só a verificação em segundo plano usa a rede
+        try:
+            downloaded_files = extractor.download_csv_files(extract_path=self.base_path)
+            failed = [name for name, path in downloaded_files.items() if not path]
+            if failed:
+                self.refresh_status = f"arquivos não puderam ser baixados: {', '.join(failed)}"
+            else:
+                self.refresh_status = "arquivos verificados"
+        except Exception as e:
+            self.refresh_status = f"falha ao verificar os arquivos: {e}"
+
+    def _wait_for_file(self, file_path):
+        """Se o CSV ainda não existe e o download está em andamento, espera por ele."""
+        if os.path.exists(file_path) or self._refresh_thread is None or not self._refresh_thread.is_alive():
+            return
+        print(f"Aguardando o download de '{os.path.basename(file_path)}'...")
+        self._refresh_thread.join()
+
+    def _load(self, name, kind, file_path):
+        if kind == RAW:
+            from data_exploration import explorer
+            return explorer.load_csv_to_df(name, self.base_path)
+        from data_transformation import transformer
+        return transformer.transform_dataset(name, file_path)
+
+    def get(self, name, kind=RAW):
+        """Retorna o DataFrame bruto ou transformado do conjunto de dados, lendo-o só se necessário."""
+        # Import tardio: o menu do explorador abre sem carregar o pandas (só no primeiro conjunto pedido)
+        from data_ingestion import reader
+        file_path = reader.get_dataset_path(name, self.base_path)
+        self._wait_for_file(file_path)
+        signature = _file_signature(file_path)
+        key = (name, kind)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] == signature:
+            self._entries.move_to_end(key)
+            return entry[0]
+        if entry is not None:
+            print(f"'{name}.csv' mudou em disco desde a leitura. Recarregando.")
+            del self._entries[key]
+        if signature is None:
+            print(f"Arquivo '{file_path}' não encontrado.")
+            return None
+
+        df = self._load(name, kind, file_path)
+        if df is None:
+            return None
+        self._entries[key] = (df, int(df.memory_usage(deep=True).sum()), signature)
+        self._evict(keep=key)
+        return df
+
+    def _evict(self, keep):
+        """Remove as entradas usadas há mais tempo até o cache caber no limite (exceto 'keep')."""
+        while self.used_bytes > self.max_bytes:
+            oldest = next((key for key in self._entries if key != keep), None)
+            if oldest is None:
+                break
+            del self._entries[oldest]
+            print(f"Catálogo: '{oldest[0]}' ({oldest[1]}) removido da memória (limite de {self.max_bytes} bytes).")
+
+    def clear(self):
+        self._entries.clear()
@@ -2,60 +2,86 @@
 import pandas as pd
 import os
 from config import settings
-import numpy as np
+from data_ingestion import reader
+from data_exploration import profiler
 
 def load_csv_to_df(file_key_name, base_path=None):
     """Carrega um arquivo CSV específico em um DataFrame."""
     if base_path is None:
         base_path = settings.EXTRACAO_PATH
         
-    file_name = f"{file_key_name}.csv"
-    file_path = os.path.join(base_path, file_name)
+    file_path = reader.get_dataset_path(file_key_name, base_path)
 
     if not os.path.exists(file_path):
         print(f"Arquivo '{file_path}' não encontrado.")
         return None
     try:
-        df = pd.read_csv(file_path)
+        # Dados brutos: todas as colunas, mas com tipos declarados e '\\N' como nulo
+        df = reader.read_dataset(file_key_name, file_path, all_columns=True)
         print(f"Arquivo '{file_path}' carregado com sucesso.")
         return df
     except Exception as e:
         print(f"Erro ao carregar o arquivo '{file_path}': {e}")
         return None
 
-def display_df_info(df, df_name="DataFrame"):
-    """Mostra informações básicas sobre o DataFrame."""
-    if df is None:
+def _profile_dataset_file(file_key_name):
+    """Perfil do CSV bruto de um conjunto de dados (lido em blocos), ou None se não puder ser lido."""
+    file_path = reader.get_dataset_path(file_key_name)
+    if not os.path.exists(file_path):
+        print(f"Arquivo '{file_path}' não encontrado.")
+        return None
+    try:
+        return profiler.profile_file(file_key_name, file_path)
+    except Exception as e:
+        print(f"Erro ao analisar o arquivo '{file_path}': {e}")
+        return None
+
+def display_df_info(df, df_name="DataFrame", approximate=None):
+    """
+    Mostra informações básicas sobre o DataFrame a partir de um único perfil das colunas
+    (tipos, nulos, distintos, valor mais frequente e estatísticas numéricas), calculado uma vez
+    e reaproveitado nas chamadas seguintes (ver data_exploration.profiler).
+    'df' também pode ser o nome de um conjunto de dados (ex: "results"): o CSV bruto é então
+    lido em blocos, sem carregar o arquivo inteiro, e o perfil fica em cache pelo MD5 do arquivo.
+    Com approximate=True (ou acima de PROFILE_EXACT_MAX_ROWS linhas), distintos, quartis e
+    valor mais frequente são estimados (HyperLogLog e amostra de reservatório).
+    """
+    profile = None
+    if isinstance(df, str):
+        profile = _profile_dataset_file(df)
+        df = None
+    elif df is not None:
+        profile = profiler.profile_dataframe(df, approximate)
+    if profile is None:
         print(f"{df_name} está vazio ou não pôde ser carregado.")
         return
-    
+
+    stats = profile["stats"]
     print(f"\n--- Informações sobre: {df_name} ---")
-    print(f"\nForma (linhas, colunas): {df.shape}")
+    print(f"\nForma (linhas, colunas): {(profile['rows'], len(stats))}")
 
     print("\nPrimeiras 5 linhas (.head()):")
-    print(df.head())
+    print(profile["sample"])
 
-    print("\nInformações gerais (.info()):")
-    df.info()
+    print("\nInformações gerais (tipo e valores não nulos por coluna):")
+    print(stats[["dtype", "nao_nulos"]])
+    if df is not None:
+        print(f"Uso de memória: {df.memory_usage(deep=False).sum() / 1024:.1f} KB")
 
-    # Verificar se há colunas numéricas antes de chamar .describe()
-    numeric_cols = df.select_dtypes(include=np.number).columns
-    if not numeric_cols.empty:
-        print("\nEstatísticas descritivas para colunas numéricas (.describe()):")
-        print(df.describe())
+    if profile["approximate"]:
+        print("\nEstatísticas descritivas (aproximadas: distintos por HyperLogLog; top, freq e quartis por amostragem):")
     else:
-        print("\nEstatísticas descritivas (.describe() para todas as colunas):")
-        print(df.describe(include='all'))
-
+        print("\nEstatísticas descritivas:")
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(stats.drop(columns=["dtype", "nulos"]))
 
     print("\nContagem de valores nulos por coluna:")
-    print(df.isnull().sum())
+    print(stats["nulos"])
     
     print(f"--- Fim das informações sobre: {df_name} ---\n")
 
 if __name__ == '__main__':
     # Teste rápido do módulo de exploração
-    import numpy as np # Adicionado para np.number
     print("Testando o módulo de exploração de dados...")
     
     # Tenta carregar e exibir informações do 'constructors.csv'
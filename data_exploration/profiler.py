@@ -0,0 +1,260 @@
+# data_exploration/profiler.py
+import os
+import pickle
+import weakref
+import numpy as np
+import pandas as pd
+from config import settings
+
+# Colunas do perfil, na ordem exibida
+PROFILE_COLUMNS = ["dtype", "nao_nulos", "nulos", "distintos", "top", "freq",
+                   "media", "desvio", "min", "25%", "50%", "75%", "max"]
+
+class HyperLogLog:
+    """
+    Contagem aproximada de valores distintos (HyperLogLog) com 2**p registradores.
+    Memória fixa (16 KB com p=14) e erro típico de 1.04 / sqrt(2**p) (~0,8%).
+    Atualizada em lote a partir dos hashes de 64 bits do pandas.
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_array(np.asarray(values))
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # Posição do primeiro bit 1 nos 32 bits baixos do hash (1 a 33)
+        low = (hashes & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        bit_length = np.zeros(len(low), dtype=np.int64)
+        nonzero = low > 0
+        bit_length[nonzero] = np.floor(np.log2(low[nonzero])).astype(np.int64) + 1
+        rank = (33 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros: # Correção para cardinalidades pequenas (linear counting)
+            return int(round(self.m * np.log(self.m / zeros)))
+        return int(round(raw))
+
+class RowReservoir:
+    """
+    Amostra uniforme de até 'size' linhas de um fluxo de blocos (amostragem de reservatório
+    por prioridade: cada linha recebe uma chave aleatória e ficam as 'size' menores).
+    """
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.rows = None
+
+    def update(self, chunk):
+        keys = np.concatenate([self.keys, self.rng.random(len(chunk))])
+        rows = chunk if self.rows is None else pd.concat([self.rows, chunk], ignore_index=True)
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, rows = keys[keep], rows.iloc[keep]
+        self.keys, self.rows = keys, rows.reset_index(drop=True)
+
+class _ColumnStats:
+    """Acumuladores de uma coluna, atualizados bloco a bloco (média/variância pelo método de Chan)."""
+
+    def __init__(self, hll_precision):
+        self.dtype = None
+        self.count = 0
+        self.nulls = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.hll = HyperLogLog(hll_precision)
+
+    def update(self, series):
+        self.dtype = series.dtype
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        if values.empty:
+            return
+        self.hll.update(values.to_numpy())
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            chunk = values.to_numpy(dtype=np.float64)
+            n, chunk_mean = len(chunk), chunk.mean()
+            chunk_m2 = ((chunk - chunk_mean) ** 2).sum()
+            total = self.count + n
+            delta = chunk_mean - self.mean
+            self.mean += delta * n / total
+            self.m2 += chunk_m2 + delta * delta * self.count * n / total
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            chunk_min, chunk_max = values.min(), values.max()
+            self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+            self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+        self.count += len(values)
+
+def _quartiles(values):
+    if values.empty or not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values)):
+        return [None, None, None]
+    return list(values.quantile([0.25, 0.5, 0.75]))
+
+def _top(values):
+    if values.empty:
+        return None, None
+    counts = values.value_counts()
+    return counts.index[0], int(counts.iloc[0])
+
+def _exact_column_stats(values, numeric, ordered):
+    """
+    Estatísticas exatas de uma coluna sem nulos a partir de uma única contagem de valores
+    (value_counts): distintos, top/freq e, para colunas ordenáveis, mínimo, quartis e máximo
+    pelas contagens acumuladas dos valores ordenados; média e desvio ponderados pelas contagens.
+    Depois da contagem, o custo é proporcional aos valores distintos, não às linhas.
+    """
+    counts = values.value_counts()
+    counts = counts[counts > 0] # Categorias sem nenhuma linha
+    if counts.empty:
+        no_mean = np.nan if numeric else None
+        return [0, None, None, no_mean, no_mean, None, None, None, None, None]
+    summary = [len(counts), counts.index[0], int(counts.iloc[0])]
+    if not ordered:
+        return summary + [None] * 7
+
+    by_value = counts.sort_index()
+    keys = by_value.index
+    cumulative = np.cumsum(by_value.to_numpy())
+    n = int(cumulative[-1])
+
+    def at(rank): # Valor na posição 'rank' (0 a n-1) da coluna ordenada
+        return keys[np.searchsorted(cumulative, rank, side="right")]
+
+    quartiles = []
+    for q in (0.25, 0.5, 0.75): # Interpolação linear, como Series.quantile
+        position = q * (n - 1)
+        low_rank = int(np.floor(position))
+        low, high = at(low_rank), at(min(low_rank + 1, n - 1))
+        quartiles.append(low + (high - low) * (position - low_rank))
+
+    mean = std = None
+    if numeric:
+        weights = by_value.to_numpy(dtype=np.float64)
+        value_array = keys.to_numpy(dtype=np.float64)
+        mean = float((value_array * weights).sum() / n)
+        std = float(np.sqrt((weights * (value_array - mean) ** 2).sum() / (n - 1))) if n > 1 else np.nan
+    return summary + [mean, std, keys[0], *quartiles, keys[-1]]
+
+def profile_dataframe_exact(df):
+    """Perfil exato de um DataFrame em memória: todas as estatísticas de cada coluna, coluna a coluna."""
+    rows = {}
+    for col in df.columns:
+        series = df[col]
+        values = series.dropna()
+        numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+        ordered = numeric or pd.api.types.is_datetime64_any_dtype(values)
+        rows[col] = [str(series.dtype), len(values), len(series) - len(values),
+                     *_exact_column_stats(values, numeric, ordered)]
+    return {"rows": len(df), "approximate": False, "sample": df.head(), "stats": _stats_frame(rows)}
+
+def profile_chunks(chunks, sample_size=None, hll_precision=None):
+    """
+    Perfil aproximado de um fluxo de blocos (ex: CSV lido em partes), numa única passada:
+    contagens, nulos, média, desvio, mínimo e máximo exatos; distintos por HyperLogLog;
+    quartis e valor mais frequente estimados numa amostra de reservatório de 'sample_size' linhas.
+    """
+    if sample_size is None:
+        sample_size = settings.PROFILE_SAMPLE_SIZE
+    if hll_precision is None:
+        hll_precision = settings.PROFILE_HLL_PRECISION
+    reservoir = RowReservoir(sample_size)
+    columns = {}
+    total_rows = 0
+    head = None
+    for chunk in chunks:
+        if head is None:
+            head = chunk.head()
+        total_rows += len(chunk)
+        for col in chunk.columns:
+            columns.setdefault(col, _ColumnStats(hll_precision)).update(chunk[col])
+        reservoir.update(chunk)
+
+    sample = reservoir.rows if reservoir.rows is not None else pd.DataFrame(columns=list(columns))
+    rows = {}
+    for col, stats in columns.items():
+        sample_values = sample[col].dropna()
+        top, freq = _top(sample_values)
+        if freq is not None and len(sample_values):
+            freq = int(round(freq * stats.count / len(sample_values))) # Frequência projetada para o total
+        numeric = stats.count > 0 and pd.api.types.is_numeric_dtype(stats.dtype) and not pd.api.types.is_bool_dtype(stats.dtype)
+        std = float(np.sqrt(stats.m2 / (stats.count - 1))) if numeric and stats.count > 1 else None
+        rows[col] = [str(stats.dtype), stats.count, stats.nulls, min(stats.hll.estimate(), stats.count), top, freq,
+                     stats.mean if numeric else None, std, stats.min, *_quartiles(sample_values), stats.max]
+    return {"rows": total_rows, "approximate": True, "sample": head if head is not None else sample,
+            "stats": _stats_frame(rows)}
+
+def _stats_frame(rows):
+    return pd.DataFrame.from_dict(rows, orient="index", columns=PROFILE_COLUMNS)
+
+# Perfis de DataFrames em memória já calculados (descartados quando o DataFrame deixa de existir)
+_frame_profiles = {}
+
+def profile_dataframe(df, approximate=None):
+    """
+    Perfil de um DataFrame em memória, reaproveitado enquanto o mesmo objeto existir.
+    Com approximate=None, usa o modo aproximado acima de PROFILE_EXACT_MAX_ROWS linhas.
+    """
+    if approximate is None:
+        approximate = len(df) > settings.PROFILE_EXACT_MAX_ROWS
+    key = (id(df), approximate)
+    cached = _frame_profiles.get(key)
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+    if approximate:
+        chunk_size = settings.STREAM_CHUNKSIZE
+        profile = profile_chunks(df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+    else:
+        profile = profile_dataframe_exact(df)
+    _frame_profiles[key] = (weakref.ref(df, lambda _, key=key: _frame_profiles.pop(key, None)), profile)
+    return profile
+
+def _cache_file(name, source_md5, cache_path):
+    variant = f"s{settings.PROFILE_SAMPLE_SIZE}.p{settings.PROFILE_HLL_PRECISION}"
+    return os.path.join(cache_path, f"{name}.{variant}.{source_md5}.pkl")
+
+def profile_file(name, file_path=None, chunksize=None, cache_path=None):
+    """
+    Perfil do CSV bruto de um conjunto de dados (todas as colunas), lido em blocos com memória
+    constante. O resultado fica em disco, identificado pelo MD5 do arquivo (do manifesto da extração):
+    explorar de novo o mesmo arquivo não relê nada.
+    """
+    from data_extraction.extractor import get_file_md5
+    from data_ingestion import reader
+
+    if file_path is None:
+        file_path = reader.get_dataset_path(name)
+    if chunksize is None:
+        chunksize = settings.STREAM_CHUNKSIZE
+    if cache_path is None:
+        cache_path = settings.PROFILE_CACHE_PATH
+
+    cached_path = _cache_file(name, get_file_md5(file_path), cache_path)
+    if os.path.exists(cached_path):
+        try:
+            with open(cached_path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Aviso: perfil em cache '{cached_path}' ilegível ({e}). Recalculando.")
+
+    profile = profile_chunks(reader.read_dataset_chunks(name, file_path, chunksize, all_columns=True))
+    try:
+        os.makedirs(cache_path, exist_ok=True)
+        tmp_path = f"{cached_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(profile, f)
+        os.replace(tmp_path, cached_path)
+    except Exception as e:
+        print(f"Aviso: não foi possível gravar o perfil de '{name}' em cache: {e}")
+    return profile
@@ -1,8 +1,11 @@
 # data_extraction/extractor.py
 import os
-import requests
 import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config import settings # Importa as configurações
+from instrumentation.metrics import instrumented
 
 def calculate_md5(file_path):
     """Calcula o hash MD5 de um arquivo."""
@@ -12,69 +15,287 @@ def calculate_md5(file_path):
             hash_md5.update(chunk)
     return hash_md5.hexdigest()
 
-def download_csv_files(force_download=False):
+def create_http_session(pool_size=None):
+    """Cria uma sessão HTTP com pool de conexões, compartilhada entre os workers de download."""
+    # Import tardio: requests só é carregado quando há download (get_file_md5 e afins não precisam dele)
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    if pool_size is None:
+        pool_size = settings.DOWNLOAD_MAX_WORKERS
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_expected_hashes(session, md5_hash_url=None):
+    """Baixa o arquivo de hashes MD5 e retorna um dicionário {nome_arquivo: md5}."""
+    if md5_hash_url is None:
+        md5_hash_url = settings.MD5_HASH_URL
+    print(f"Baixando arquivo de hash MD5 de: {md5_hash_url}")
+    response = session.get(md5_hash_url, timeout=10)
+    response.raise_for_status()
+    expected_hashes = {}
+    lines = response.text.strip().split('\n')
+    for line in lines[1:]: # Ignora cabeçalho
+        if ',' in line:
+            filename_csv, md5_hash = line.split(',')
+            expected_hashes[filename_csv.strip()] = md5_hash.strip()
+    print("Hashes MD5 esperados carregados.")
+    return expected_hashes
+
+def get_manifest_path(extract_path=None):
+    """Retorna o caminho do manifesto de extração, guardado ao lado da pasta de extração."""
+    if extract_path is None or os.path.normpath(extract_path) == os.path.normpath(settings.EXTRACAO_PATH):
+        return settings.EXTRACAO_MANIFEST_PATH
+    return f"{os.path.normpath(extract_path)}_manifest.json"
+
+def load_manifest(manifest_path=None):
+    """Carrega o manifesto de extração. Retorna um dicionário vazio se não existir ou estiver corrompido."""
+    if manifest_path is None:
+        manifest_path = settings.EXTRACAO_MANIFEST_PATH
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError) as e:
+        print(f"Aviso: manifesto '{manifest_path}' ilegível ({e}). Ignorando.")
+        return {}
+
+def save_manifest(manifest, manifest_path=None):
+    """Grava o manifesto de extração de forma atômica."""
+    if manifest_path is None:
+        manifest_path = settings.EXTRACAO_MANIFEST_PATH
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def _stat_matches(file_path, entry):
+    """Verifica se tamanho e mtime do arquivo local batem com o registrado no manifesto."""
+    if not entry or not entry.get('md5'):
+        return False
+    stat = os.stat(file_path)
+    return stat.st_size == entry.get('size') and stat.st_mtime_ns == entry.get('mtime_ns')
+
+def get_file_md5(file_path, manifest=None):
+    """
+    Retorna o MD5 de um arquivo local, reaproveitando o valor do manifesto quando
+    tamanho e mtime não mudaram (evita reler o arquivo). Calcula do zero caso contrário.
+    """
+    if manifest is None:
+        manifest = load_manifest(get_manifest_path(os.path.dirname(file_path)))
+    entry = manifest.get(os.path.basename(file_path))
+    if _stat_matches(file_path, entry):
+        return entry['md5']
+    return calculate_md5(file_path)
+
+def _manifest_entry(url, file_path, md5, etag=None, last_modified=None):
+    """Monta a entrada do manifesto para um arquivo completo."""
+    stat = os.stat(file_path)
+    return {
+        'url': url,
+        'etag': etag,
+        'last_modified': last_modified,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'md5': md5,
+    }
+
+def fetch_to_file(session, url, file_path, validators=None, partial=None, chunk_size=None, on_headers=None):
+    """
+    Baixa 'url' em blocos direto para o disco, calculando o MD5 enquanto grava.
+    O conteúdo é escrito em '<arquivo>.part' e só substitui o destino ao final,
+    então uma falha no meio do download não corrompe o arquivo existente.
+
+    - validators: {'etag', 'last_modified'} do arquivo local; envia If-None-Match/If-Modified-Since.
+    - partial: {'etag', 'last_modified'} do '.part' interrompido; retoma com Range/If-Range.
+    - on_headers: callback chamado com (etag, last_modified) assim que a resposta chega,
+      para registrar os validadores do '.part' antes de começar a gravar.
+
+    Retorna None se o servidor responder 304 (não modificado), ou um dicionário
+    com 'md5', 'etag', 'last_modified' e 'resumed_from' (bytes reaproveitados).
+    """
+    if chunk_size is None:
+        chunk_size = settings.DOWNLOAD_CHUNK_SIZE
+    tmp_path = f"{file_path}.part"
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    resume_from = 0
+    if partial and os.path.exists(tmp_path):
+        if_range = partial.get('etag') or partial.get('last_modified')
+        part_size = os.path.getsize(tmp_path)
+        if if_range and part_size > 0:
+            headers['Range'] = f"bytes={part_size}-"
+            headers['If-Range'] = if_range
+            resume_from = part_size
+
+    with session.get(url, headers=headers, stream=True, timeout=settings.DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            return None
+        if response.status_code == 416 and resume_from:
+            # O '.part' não corresponde mais ao recurso remoto: recomeça do zero
+            os.remove(tmp_path)
+            return fetch_to_file(session, url, file_path, validators, None, chunk_size, on_headers)
+        response.raise_for_status()
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        hash_md5 = hashlib.md5()
+        if response.status_code == 206 and resume_from:
+            # Retomada: o MD5 precisa incluir os bytes já gravados
+            with open(tmp_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    hash_md5.update(chunk)
+            mode = 'ab'
+        else:
+            resume_from = 0
+            mode = 'wb'
+        if on_headers:
+            on_headers(etag, last_modified)
+
+        with open(tmp_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    hash_md5.update(chunk)
+    os.replace(tmp_path, file_path)
+    return {'md5': hash_md5.hexdigest(), 'etag': etag, 'last_modified': last_modified, 'resumed_from': resume_from}
+
+class _ManifestWriter:
+    """Mantém o manifesto em memória e o grava a cada alteração (acesso serializado entre os workers)."""
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+        self._lock = threading.Lock()
+
+    def get(self, file_name):
+        with self._lock:
+            return dict(self.manifest.get(file_name) or {})
+
+    def update(self, file_name, **fields):
+        with self._lock:
+            entry = self.manifest.setdefault(file_name, {})
+            entry.update(fields)
+            save_manifest(self.manifest, self.manifest_path)
+
+def _download_file(session, manifest, file_name, url, file_path, expected_md5, force_download):
+    """Baixa um único arquivo (executado dentro do pool de workers). Retorna o caminho ou None em caso de falha."""
+    import requests
+    entry = manifest.get(file_name)
+    validators = None
+    if os.path.exists(file_path):
+        local_is_known = entry.get('url') == url and _stat_matches(file_path, entry)
+        local_md5 = entry['md5'] if local_is_known else calculate_md5(file_path)
+        if not force_download and expected_md5:
+            if local_md5 == expected_md5:
+                print(f"Arquivo '{file_path}' já existe e MD5 confere. Pulando download.")
+                if not local_is_known:
+                    manifest.update(file_name, **_manifest_entry(url, file_path, local_md5,
+                                                                 entry.get('etag'), entry.get('last_modified')))
+                return file_path
+            print(f"Arquivo '{file_path}' existe, mas MD5 não confere. Baixando novamente.")
+        elif not force_download and local_is_known:
+            # Sem hash esperado: pergunta ao servidor se o arquivo mudou (uma ida e volta, sem re-hash)
+            validators = entry
+            print(f"Arquivo '{file_path}' já existe. Verificando no servidor se houve alteração.")
+        elif not force_download:
+            print(f"Arquivo '{file_path}' já existe, mas hash não foi verificado. Baixando novamente para garantir.")
+
+    partial = entry.get('partial') or {}
+    if force_download or partial.get('url') != url:
+        partial = None
+
+    def register_partial(etag, last_modified):
+        manifest.update(file_name, partial={'url': url, 'etag': etag, 'last_modified': last_modified})
+
+    try:
+        print(f"Baixando '{file_name}' de '{url}'...")
+        result = fetch_to_file(session, url, file_path, validators=validators, partial=partial,
+                               on_headers=register_partial)
+        if result is None:
+            print(f"'{file_name}' não foi modificado no servidor (304). Mantendo arquivo local.")
+            return file_path
+        if result['resumed_from']:
+            print(f"Download de '{file_name}' retomado a partir do byte {result['resumed_from']}.")
+        fields = _manifest_entry(url, file_path, result['md5'], result['etag'], result['last_modified'])
+        fields['partial'] = None
+        manifest.update(file_name, **fields)
+        print(f"'{file_name}' baixado com sucesso em '{file_path}'.")
+        if expected_md5 and result['md5'] != expected_md5:
+            print(f"Aviso: MD5 de '{file_name}' ({result['md5']}) difere do esperado ({expected_md5}).")
+    except requests.exceptions.Timeout:
+        print(f"Erro de Timeout ao tentar baixar '{file_name}'.")
+    except requests.exceptions.HTTPError as http_err:
+        print(f"Erro HTTP ao tentar baixar '{file_name}': {http_err}")
+    except requests.exceptions.RequestException as e:
+        print(f"Erro ao baixar '{file_name}': {e}")
+    except Exception as e_gen:
+        print(f"Ocorreu um erro inesperado durante o download de '{file_name}': {e_gen}")
+        return None # Indica falha no download
+    return file_path
+
+@instrumented("extracao")
+def download_csv_files(force_download=False, urls=None, extract_path=None, md5_hash_url=None, max_workers=None):
     """
     Baixa os arquivos CSV.
     Cria a pasta 'extracao' se não existir.
     Verifica MD5 para evitar redownload (diferencial), a menos que force_download seja True.
+    Os downloads rodam em paralelo num pool limitado de workers (max_workers) que
+    compartilha uma única sessão HTTP; com max_workers=1 o comportamento é sequencial.
+    Um manifesto persistente (ETag/Last-Modified, tamanho, mtime e MD5) permite requisições
+    condicionais, evita re-hash de arquivos inalterados e retoma downloads interrompidos (Range).
+    'urls', 'extract_path' e 'md5_hash_url' permitem apontar para outro servidor/pasta (ex: testes locais).
     Trata erros de download.
     Retorna um dicionário com os caminhos dos arquivos baixados.
     """
-    os.makedirs(settings.EXTRACAO_PATH, exist_ok=True)
-    print(f"Pasta de extração: '{settings.EXTRACAO_PATH}'")
+    import requests
+    if urls is None:
+        urls = settings.CSV_URLS
+    if extract_path is None:
+        extract_path = settings.EXTRACAO_PATH
+    if max_workers is None:
+        max_workers = settings.DOWNLOAD_MAX_WORKERS
+    max_workers = max(1, min(max_workers, len(urls) or 1))
+
+    os.makedirs(extract_path, exist_ok=True)
+    print(f"Pasta de extração: '{extract_path}'")
 
     downloaded_files = {}
     expected_hashes = {}
+    manifest = _ManifestWriter(get_manifest_path(extract_path))
+
+    with create_http_session(pool_size=max_workers) as session:
+        # Baixar e carregar hashes MD5 esperados
+        if not force_download:
+            try:
+                expected_hashes = fetch_expected_hashes(session, md5_hash_url)
+            except requests.exceptions.RequestException as e:
+                # Sem os hashes, cada arquivo é validado por requisição condicional (ETag/Last-Modified)
+                print(f"Erro ao baixar o arquivo de hash MD5: {e}. Arquivos serão verificados por requisição condicional.")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for name, url in urls.items():
+                file_name = f"{name}.csv"
+                file_path = os.path.join(extract_path, file_name)
+                futures[name] = executor.submit(
+                    _download_file, session, manifest, file_name, url, file_path,
+                    expected_hashes.get(file_name), force_download
+                )
+            # Mantém a ordem de 'urls' no dicionário retornado
+            for name, future in futures.items():
+                downloaded_files[name] = future.result()
 
-    # Baixar e carregar hashes MD5 esperados
-    if not force_download:
-        try:
-            print(f"Baixando arquivo de hash MD5 de: {settings.MD5_HASH_URL}")
-            response = requests.get(settings.MD5_HASH_URL, timeout=10)
-            response.raise_for_status()
-            lines = response.text.strip().split('\n')
-            for line in lines[1:]: # Ignora cabeçalho
-                if ',' in line:
-                    filename_csv, md5_hash = line.split(',')
-                    expected_hashes[filename_csv.strip()] = md5_hash.strip()
-            print("Hashes MD5 esperados carregados.")
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao baixar o arquivo de hash MD5: {e}. Downloads prosseguirão sem verificação de hash ou forçando se especificado.")
-            if not force_download: # Se não for forçado, e o hash falhou, é melhor baixar
-                 force_download = True # Considera forçar se o arquivo de hash falhou
-
-    for name, url in settings.CSV_URLS.items():
-        file_name = f"{name}.csv"
-        file_path = os.path.join(settings.EXTRACAO_PATH, file_name)
-        downloaded_files[name] = file_path
-
-        if not force_download and os.path.exists(file_path) and file_name in expected_hashes:
-            local_md5 = calculate_md5(file_path)
-            if local_md5 == expected_hashes[file_name]:
-                print(f"Arquivo '{file_path}' já existe e MD5 confere. Pulando download.")
-                continue
-            else:
-                print(f"Arquivo '{file_path}' existe, mas MD5 não confere. Baixando novamente.")
-        elif not force_download and os.path.exists(file_path):
-             print(f"Arquivo '{file_path}' já existe, mas hash não foi verificado. Baixando novamente para garantir.")
-
-        try:
-            print(f"Baixando '{file_name}' de '{url}'...")
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
-            print(f"'{file_name}' baixado com sucesso em '{file_path}'.")
-        except requests.exceptions.Timeout:
-            print(f"Erro de Timeout ao tentar baixar '{file_name}'.")
-        except requests.exceptions.HTTPError as http_err:
-            print(f"Erro HTTP ao tentar baixar '{file_name}': {http_err}")
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao baixar '{file_name}': {e}")
-        except Exception as e_gen:
-            print(f"Ocorreu um erro inesperado durante o download de '{file_name}': {e_gen}")
-            downloaded_files[name] = None # Indica falha no download
-            
     return downloaded_files
 
 if __name__ == '__main__':
@@ -84,4 +305,4 @@ if __name__ == '__main__':
     if paths:
         print("\nCaminhos dos arquivos baixados:")
         for name, path in paths.items():
-            print(f"- {name}: {path} (Existe: {os.path.exists(path) if path else False})")
\ No newline at end of file
+            print(f"- {name}: {path} (Existe: {os.path.exists(path) if path else False})")
@@ -0,0 +1,148 @@
+# data_ingestion/reader.py
+import csv
+import os
+import pandas as pd
+from config import settings
+
+# Esquema declarado de cada conjunto de dados:
+# - usecols: colunas realmente usadas pelo transformer (as demais nem são parseadas)
+# - dtype: tipos explícitos, evitando a inferência do pandas coluna a coluna
+#   (colunas de texto como object: com dtype=str, o engine pyarrow converte nulos na string 'None')
+# - aliases: nomes alternativos encontrados em alguns CSVs, renomeados após a leitura
+DATASET_SCHEMAS = {
+    "constructors": {
+        "usecols": ["constructorId", "name"],
+        "dtype": {"constructorId": "int32", "name": object},
+    },
+    "drivers": {
+        "usecols": ["driverId", "forename", "surname"],
+        "dtype": {"driverId": "int32", "forename": object, "surname": object},
+    },
+    "races": {
+        "usecols": ["raceId", "year", "name", "date"],
+        "dtype": {"raceId": "int32", "year": "int16", "name": object, "date": object},
+    },
+    "results": {
+        "usecols": ["resultId", "raceId", "driverId", "constructorId", "positionOrder", "points", "fastestLapTime"],
+        "dtype": {
+            "resultId": "int32",
+            "raceId": "int32",
+            "driverId": "int32",
+            "constructorId": "int32",
+            "positionOrder": "int16",
+            "points": "float64",
+            "fastestLapTime": object,
+        },
+        "aliases": {"raceld": "raceId"},
+    },
+}
+
+def get_dataset_path(name, base_path=None):
+    """Retorna o caminho do CSV de um conjunto de dados na pasta de extração."""
+    if base_path is None:
+        base_path = settings.EXTRACAO_PATH
+    return os.path.join(base_path, f"{name}.csv")
+
+def resolve_engine(engine=None, fully_typed=True):
+    """
+    Resolve o engine de leitura do pandas ('pyarrow' só se o pacote estiver instalado).
+    Em modo 'auto', o pyarrow só é escolhido quando todas as colunas lidas têm tipo declarado:
+    a inferência de tipos do pyarrow com '\\N' como nulo falha em colunas inteiras com nulos.
+    """
+    if engine is None:
+        engine = settings.CSV_ENGINE
+    if engine == "auto" and not fully_typed:
+        return "c"
+    if engine in ("auto", "pyarrow"):
+        try:
+            import pyarrow # noqa: F401
+            return "pyarrow"
+        except ImportError:
+            if engine == "pyarrow":
+                print("Aviso: pyarrow não está instalado. Usando o engine 'c' do pandas.")
+            return "c"
+    return engine
+
+def _read_header(file_path):
+    """Lê apenas a linha de cabeçalho do CSV."""
+    with open(file_path, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+def build_read_options(name, file_path, all_columns=False):
+    """
+    Monta os argumentos de pd.read_csv para o conjunto de dados a partir do esquema declarado.
+    Retorna (opções, renomeações). As colunas são resolvidas contra o cabeçalho real do arquivo,
+    o que permite aceitar os aliases declarados e passar uma lista explícita de colunas a qualquer engine.
+    """
+    schema = DATASET_SCHEMAS.get(name, {})
+    aliases = schema.get("aliases", {})
+    header = _read_header(file_path)
+    # Nome da coluna no arquivo -> nome canônico do esquema
+    canonical = {col: aliases.get(col, col) for col in header}
+    wanted = set(schema.get("usecols", header))
+    declared_dtypes = schema.get("dtype", {})
+
+    usecols = None
+    if not all_columns:
+        usecols = [col for col in header if canonical[col] in wanted]
+    selected = header if usecols is None else usecols
+    dtype = {col: declared_dtypes[canonical[col]] for col in selected if canonical[col] in declared_dtypes}
+    renames = {col: canonical[col] for col in selected if canonical[col] != col}
+
+    options = {
+        "usecols": usecols,
+        "dtype": dtype or None,
+        "na_values": settings.CSV_NULL_VALUES,
+    }
+    return options, renames
+
+def parse_csv(name, file_path, all_columns=False, engine=None):
+    """
+    Faz o parse do CSV de um conjunto de dados usando o esquema declarado em DATASET_SCHEMAS:
+    somente as colunas usadas pelo transformer (a menos que all_columns=True),
+    tipos explícitos e '\\N' tratado como nulo já no parse.
+    Se os tipos declarados não couberem nos dados, relê o arquivo com inferência de tipos.
+    """
+    options, renames = build_read_options(name, file_path, all_columns)
+    fully_typed = options["usecols"] is not None and len(options["dtype"] or {}) == len(options["usecols"])
+    engine = resolve_engine(engine, fully_typed)
+
+    try:
+        df = pd.read_csv(file_path, engine=engine, **options)
+    except (ValueError, TypeError) as e:
+        print(f"Aviso: tipos declarados para '{name}' não puderam ser aplicados ({e}). Lendo com inferência de tipos.")
+        options["dtype"] = None
+        df = pd.read_csv(file_path, engine="c", **options)
+
+    if renames:
+        df = df.rename(columns=renames)
+    return df
+
+def read_dataset(name, file_path=None, all_columns=False, engine=None, use_staging=None):
+    """
+    Lê um conjunto de dados. Com o staging habilitado (settings.STAGING_ENABLED),
+    reaproveita a cópia colunar já convertida do CSV (ver data_ingestion.staging);
+    caso contrário, faz o parse do CSV com parse_csv.
+    """
+    if file_path is None:
+        file_path = get_dataset_path(name)
+    if use_staging is None:
+        use_staging = settings.STAGING_ENABLED
+    if use_staging:
+        from data_ingestion import staging # Import tardio: staging depende deste módulo
+        return staging.read_staged(name, file_path, all_columns, engine)
+    return parse_csv(name, file_path, all_columns, engine)
+
+def read_dataset_chunks(name, file_path=None, chunksize=None, all_columns=False):
+    """
+    Lê o CSV de um conjunto de dados em blocos de 'chunksize' linhas (gerador de DataFrames),
+    com o mesmo esquema de parse_csv. Usa o engine 'c', único que suporta leitura em blocos.
+    """
+    if file_path is None:
+        file_path = get_dataset_path(name)
+    if chunksize is None:
+        chunksize = settings.STREAM_CHUNKSIZE
+    options, renames = build_read_options(name, file_path, all_columns)
+    with pd.read_csv(file_path, engine="c", chunksize=chunksize, **options) as chunks:
+        for chunk in chunks:
+            yield chunk.rename(columns=renames) if renames else chunk
@@ -0,0 +1,111 @@
+# data_ingestion/staging.py
+import hashlib
+import os
+from config import settings
+from data_extraction.extractor import get_file_md5
+from data_ingestion import reader
+
+STAGING_EXTENSION = ".feather"
+
+def is_available():
+    """O staging usa o formato Feather (Arrow IPC), que depende do pyarrow."""
+    try:
+        import pyarrow.feather # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _schema_fingerprint(name, all_columns):
+    """Hash curto do esquema declarado: mudar o esquema invalida as entradas já convertidas."""
+    schema = reader.DATASET_SCHEMAS.get(name, {})
+    payload = repr((sorted((k, repr(v)) for k, v in schema.items()), all_columns, settings.CSV_NULL_VALUES))
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()[:8]
+
+def _entry_prefix(name, all_columns):
+    """Prefixo comum às entradas de um conjunto de dados/variante (todas as versões do CSV)."""
+    variant = "all" if all_columns else "typed"
+    return f"{name}.{variant}.{_schema_fingerprint(name, all_columns)}."
+
+def get_staging_file(name, source_md5, all_columns=False, staging_path=None):
+    """Caminho da entrada de staging para a versão do CSV identificada por 'source_md5'."""
+    if staging_path is None:
+        staging_path = settings.STAGING_PATH
+    return os.path.join(staging_path, f"{_entry_prefix(name, all_columns)}{source_md5}{STAGING_EXTENSION}")
+
+def _list_entries(staging_path):
+    """Lista as entradas do staging como (caminho, tamanho, mtime)."""
+    if not os.path.isdir(staging_path):
+        return []
+    entries = []
+    for file_name in os.listdir(staging_path):
+        if file_name.endswith(STAGING_EXTENSION):
+            path = os.path.join(staging_path, file_name)
+            stat = os.stat(path)
+            entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+def evict(max_bytes=None, staging_path=None):
+    """Remove as entradas usadas há mais tempo até o staging caber em 'max_bytes'."""
+    if max_bytes is None:
+        max_bytes = settings.STAGING_MAX_BYTES
+    if staging_path is None:
+        staging_path = settings.STAGING_PATH
+    entries = sorted(_list_entries(staging_path), key=lambda e: e[2])
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        print(f"Staging: entrada '{os.path.basename(path)}' removida (limite de {max_bytes} bytes).")
+
+def _remove_stale(name, all_columns, current_path, staging_path):
+    """Remove versões antigas (outro MD5 de origem) do mesmo conjunto de dados/variante."""
+    prefix = _entry_prefix(name, all_columns)
+    for path, _, _ in _list_entries(staging_path):
+        if os.path.basename(path).startswith(prefix) and path != current_path:
+            os.remove(path)
+
+def read_staged(name, file_path, all_columns=False, engine=None, staging_path=None):
+    """
+    Lê um conjunto de dados a partir do staging colunar, convertendo o CSV na primeira vez.
+    A entrada é identificada pelo MD5 do CSV de origem (obtido do manifesto da extração),
+    então uma nova versão do arquivo invalida automaticamente a cópia anterior.
+    Leituras seguintes mapeiam o arquivo Feather em memória em vez de refazer o parse do texto.
+    Sem pyarrow, faz o parse do CSV normalmente.
+    """
+    if not is_available():
+        return reader.parse_csv(name, file_path, all_columns, engine)
+    from pyarrow import feather
+
+    if staging_path is None:
+        staging_path = settings.STAGING_PATH
+    staged_path = get_staging_file(name, get_file_md5(file_path), all_columns, staging_path)
+
+    if os.path.exists(staged_path):
+        try:
+            df = feather.read_table(staged_path, memory_map=True).to_pandas()
+            os.utime(staged_path) # Marca como usada recentemente (ordem de remoção)
+            return df
+        except Exception as e:
+            print(f"Aviso: entrada de staging '{staged_path}' ilegível ({e}). Convertendo novamente.")
+
+    df = reader.parse_csv(name, file_path, all_columns, engine)
+    try:
+        os.makedirs(staging_path, exist_ok=True)
+        tmp_path = f"{staged_path}.tmp"
+        # Sem compressão: permite mapear o arquivo em memória na leitura
+        df.to_feather(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, staged_path)
+        _remove_stale(name, all_columns, staged_path, staging_path)
+        evict(staging_path=staging_path)
+    except Exception as e:
+        print(f"Aviso: não foi possível gravar '{name}' no staging: {e}")
+    return df
+
+def clear(staging_path=None):
+    """Remove todas as entradas do staging."""
+    if staging_path is None:
+        staging_path = settings.STAGING_PATH
+    for path, _, _ in _list_entries(staging_path):
+        os.remove(path)
@@ -0,0 +1,283 @@
+# data_loading/cdc.py
+import contextlib
+import datetime
+import json
+import os
+import shutil
+import pandas as pd
+from config import settings
+from data_loading.incremental import row_fingerprints, changed_rows, removed_keys
+from instrumentation import metrics
+from instrumentation.metrics import instrumented
+
+# Captura de alterações (CDC): a cada execução, as linhas inseridas, atualizadas e removidas de cada
+# tabela em relação ao último delta publicado vão para CDC_PATH/<sequência>/<tabela>.<tipo>.parquet,
+# com um manifest.json. Os consumidores aplicam os deltas em ordem de sequência em vez de reler tudo.
+CHANGE_KINDS = ["inserted", "updated", "deleted"]
+DELTA_EXTENSION = ".parquet"
+MANIFEST_NAME = "manifest.json"
+
+# Tipos Arrow das colunas dos deltas, fixos por tabela (conforme sql_scripts/create_tables.sql): o esquema
+# de um arquivo não depende do primeiro bloco gravado (ex: um bloco só com fastestLapTime nulo continua string).
+# Colunas não declaradas aqui são gravadas como texto.
+DELTA_COLUMN_TYPES = {
+    "constructors": {"constructorId": "int32", "name": "string"},
+    "drivers": {"driverId": "int32", "fullname": "string"},
+    "races": {"raceId": "int32", "year": "int32", "name": "string", "date": "timestamp[ns]"},
+    "results": {
+        "resultId": "int32",
+        "raceId": "int32",
+        "driverId": "int32",
+        "constructorId": "int32",
+        "positionOrder": "int32",
+        "points": "int32",
+        "fastestLapTime": "string",
+        "fastestLapTimeMs": "int32",
+    },
+}
+
+def is_available():
+    """Os deltas são gravados em Parquet, que depende do pyarrow."""
+    try:
+        import pyarrow.parquet # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _state_path(file_name):
+    """Estado do CDC (fingerprints do último delta publicado e sua sequência), em CDC_PATH/_state."""
+    return os.path.join(settings.CDC_PATH, "_state", file_name)
+
+def delta_dir(sequence):
+    """Pasta do delta de número 'sequence'."""
+    return os.path.join(settings.CDC_PATH, f"{sequence:06d}")
+
+def last_sequence():
+    """Sequência do último delta publicado (0 se nenhum)."""
+    path = _state_path("sequence.json")
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8') as f:
+        return int(json.load(f)["sequence"])
+
+def _load_fingerprints(table_name):
+    """Fingerprints da tabela no último delta publicado, ou None (o próximo delta será uma foto completa)."""
+    path = _state_path(f"{table_name}.pkl")
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"Aviso: estado do CDC '{path}' ilegível ({e}). O próximo delta de '{table_name}' será completo.")
+        return None
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_json(data, path):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    _write_atomic(path, write)
+
+def _arrow_schema(table_name, columns):
+    """Esquema Arrow declarado (DELTA_COLUMN_TYPES) para as colunas de um arquivo de delta."""
+    import pyarrow as pa
+    column_types = DELTA_COLUMN_TYPES.get(table_name, {})
+    return pa.schema([pa.field(col, pa.type_for_alias(column_types.get(col, "string"))) for col in columns])
+
+def _changed_row_count(manifest):
+    if manifest is None:
+        return 0
+    return sum(table[kind] for table in manifest["tables"].values() for kind in CHANGE_KINDS)
+
+class _TableDelta:
+    """
+    Delta de uma tabela, gravado bloco a bloco: cada tipo de alteração tem um ParquetWriter,
+    aberto só quando aparece a primeira linha daquele tipo. Os fingerprints dos blocos (os mesmos
+    objetos do snapshot da carga) e os do delta anterior ficam em memória: O(linhas) da tabela.
+    """
+
+    def __init__(self, name, directory):
+        self.table_name = settings.TABLE_NAMES[name]
+        self.key_columns = settings.PRIMARY_KEYS[name]
+        self.directory = directory
+        self.previous = _load_fingerprints(self.table_name)
+        self.fingerprints = []
+        self.counts = dict.fromkeys(CHANGE_KINDS, 0)
+        self.files = {}
+        self._writers = {}
+
+    @property
+    def changed(self):
+        return self.previous is None or any(self.counts.values())
+
+    def add(self, df, fingerprints):
+        self.fingerprints.append(fingerprints)
+        if self.previous is None: # Sem delta anterior: foto completa da tabela
+            self._write("inserted", df)
+            return
+        is_new, is_changed = changed_rows(fingerprints, self.previous)
+        self._write("inserted", df[is_new])
+        self._write("updated", df[is_changed])
+
+    def finish(self):
+        """Grava as chaves removidas (só conhecidas depois de todos os blocos) e fecha os arquivos."""
+        current = pd.concat(self.fingerprints) if len(self.fingerprints) > 1 else self.fingerprints[0]
+        if self.previous is not None:
+            self._write("deleted", removed_keys(current, self.previous).to_frame(index=False))
+        self.close()
+        return current
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def _write(self, kind, df):
+        if df.empty:
+            return
+        import pyarrow as pa
+        from pyarrow import parquet
+        writer = self._writers.get(kind)
+        schema = writer.schema if writer else _arrow_schema(self.table_name, df.columns)
+        # Tipos inferidos do bloco (categorias, inteiros compactos, colunas só com nulos) convertidos ao declarado
+        table = pa.Table.from_pandas(df, preserve_index=False).cast(schema)
+        if writer is None:
+            file_name = f"{self.table_name}.{kind}{DELTA_EXTENSION}"
+            writer = parquet.ParquetWriter(os.path.join(self.directory, file_name), schema,
+                                           compression=settings.CDC_COMPRESSION)
+            self._writers[kind] = writer
+            self.files[kind] = file_name
+        writer.write_table(table)
+        self.counts[kind] += len(df)
+
+class ChangeCapture:
+    """
+    Captura de alterações de uma execução do pipeline. add() recebe cada DataFrame carregado
+    (ou cada bloco, no streaming) e grava as linhas inseridas e atualizadas numa pasta temporária;
+    publish() grava as chaves removidas e o manifesto, publica a pasta como CDC_PATH/<sequência>/
+    e só então avança o estado base do próximo delta. Sem nenhuma alteração, nada é publicado.
+    Um erro ao gravar o delta nunca interrompe a carga (add() roda dentro da transação, no streaming):
+    ele é exibido, o delta desta execução é descartado e as alterações entram no próximo.
+    """
+
+    def __init__(self):
+        self.sequence = last_sequence() + 1
+        self.directory = delta_dir(self.sequence)
+        self.tmp_directory = f"{self.directory}.tmp"
+        shutil.rmtree(self.tmp_directory, ignore_errors=True) # Restos de uma execução interrompida
+        os.makedirs(self.tmp_directory)
+        self.tables = {}
+        self.failed = False
+
+    def add(self, name, df, fingerprints=None):
+        """Registra o DataFrame (ou um bloco) carregado na tabela 'name'; 'fingerprints' evita recalculá-los."""
+        if self.failed:
+            return
+        try:
+            delta = self.tables.get(name)
+            if delta is None:
+                delta = self.tables[name] = _TableDelta(name, self.tmp_directory)
+            if fingerprints is None:
+                fingerprints = row_fingerprints(df, delta.key_columns)
+            delta.add(df, fingerprints)
+        except Exception as e:
+            print(f"Erro ao gravar o delta de CDC {self.sequence} ('{name}'): {e}. "
+                  "A carga continua; as alterações entram no próximo delta.")
+            self.failed = True
+            self.discard()
+
+    @instrumented("cdc", rows_out=_changed_row_count)
+    def publish(self):
+        """Publica o delta desta execução. Retorna o manifesto, ou None se nada mudou."""
+        # Manifesto na ordem de carga (no streaming, results é registrado antes das demais tabelas)
+        self.tables = {name: self.tables[name] for name in sorted(self.tables, key=settings.LOAD_ORDER.index)}
+        current = {name: delta.finish() for name, delta in self.tables.items()}
+        if not any(delta.changed for delta in self.tables.values()):
+            print(f"CDC: nenhuma alteração desde o delta {self.sequence - 1}. Nenhum delta publicado.")
+            self.discard()
+            return None
+
+        manifest = {
+            "sequence": self.sequence,
+            "previous_sequence": self.sequence - 1 or None,
+            "run_id": metrics.current_run_id(),
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "format": "parquet",
+            "compression": settings.CDC_COMPRESSION,
+            # Só as tabelas alteradas: uma tabela ausente do manifesto não mudou desde o delta anterior
+            "tables": {
+                delta.table_name: {
+                    "snapshot": delta.previous is None, # Foto completa: substitui a tabela inteira
+                    "key_columns": delta.key_columns,
+                    **delta.counts,
+                    "files": delta.files,
+                }
+                for delta in self.tables.values() if delta.changed
+            },
+        }
+        _write_json(manifest, os.path.join(self.tmp_directory, MANIFEST_NAME))
+        if os.path.exists(self.directory):
+            # Delta publicado por uma execução interrompida antes de gravar o estado: é refeito
+            print(f"Aviso: o delta {self.sequence} já existia sem estado registrado e será substituído.")
+            shutil.rmtree(self.directory)
+        os.replace(self.tmp_directory, self.directory)
+
+        # O estado só avança depois da publicação: uma falha antes disso repete o delta na próxima execução
+        os.makedirs(os.path.dirname(_state_path("sequence.json")), exist_ok=True)
+        for name, fingerprints in current.items():
+            _write_atomic(_state_path(f"{settings.TABLE_NAMES[name]}.pkl"), fingerprints.to_pickle)
+        _write_json({"sequence": self.sequence, "run_id": manifest["run_id"]}, _state_path("sequence.json"))
+
+        summary = ", ".join(f"{table_name}: +{t['inserted']} ~{t['updated']} -{t['deleted']}"
+                            f"{' (completo)' if t['snapshot'] else ''}" for table_name, t in manifest["tables"].items())
+        print(f"CDC: delta {self.sequence} publicado em '{self.directory}' ({summary}).")
+        return manifest
+
+    def discard(self):
+        """Descarta os arquivos do delta em construção (a carga falhou ou não houve alterações)."""
+        for delta in self.tables.values():
+            delta.close()
+        shutil.rmtree(self.tmp_directory, ignore_errors=True)
+
+@contextlib.contextmanager
+def capture_changes():
+    """
+    Contexto de uma carga com CDC: produz um ChangeCapture, ou None com CDC_ENABLED desligado
+    (ou sem pyarrow). O delta só é publicado se o bloco terminar sem erro, isto é, depois do
+    commit da carga; se a carga falhar, os arquivos parciais são descartados.
+    Uma falha na gravação ou na publicação do delta não desfaz a carga: o estado do CDC não avança
+    e o próximo delta inclui estas alterações.
+    """
+    if not settings.CDC_ENABLED:
+        yield None
+        return
+    if not is_available():
+        print("Aviso: pyarrow não está instalado. Os deltas de CDC não serão gravados.")
+        yield None
+        return
+    capture = ChangeCapture()
+    try:
+        yield capture
+    except BaseException:
+        capture.discard()
+        raise
+    if capture.failed:
+        return
+    try:
+        capture.publish()
+    except Exception as e:
+        print(f"Erro ao publicar o delta de CDC {capture.sequence}: {e}. As alterações entram no próximo delta.")
+        capture.discard()
+
+def read_delta(sequence, table_name, kind):
+    """Lê um arquivo de um delta publicado (DataFrame vazio se aquele tipo de alteração não ocorreu)."""
+    directory = delta_dir(sequence)
+    with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        files = json.load(f)["tables"].get(table_name, {}).get("files", {})
+    if kind not in files:
+        return pd.DataFrame()
+    return pd.read_parquet(os.path.join(directory, files[kind]))
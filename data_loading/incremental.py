@@ -0,0 +1,230 @@
+# data_loading/incremental.py
+import hashlib
+import os
+import pandas as pd
+from sqlalchemy import text, tuple_
+from sqlalchemy.sql import table as sql_table, column as sql_column
+from config import settings
+from data_loading import summaries
+from data_loading.loader import load_transaction
+
+def row_fingerprints(df, key_columns):
+    """
+    Calcula um hash de 64 bits por linha (colunas não-chave), indexado pela chave primária.
+    Duas versões da mesma linha têm o mesmo fingerprint se e somente se os valores forem iguais.
+    """
+    value_columns = [col for col in df.columns if col not in key_columns]
+    fingerprints = pd.util.hash_pandas_object(df[value_columns], index=False)
+    if len(key_columns) == 1:
+        fingerprints.index = pd.Index(df[key_columns[0]].to_numpy(), name=key_columns[0])
+    else:
+        fingerprints.index = pd.MultiIndex.from_frame(df[key_columns])
+    return fingerprints
+
+def _snapshot_path(table_name, engine):
+    """Arquivo com os fingerprints da última carga da tabela (um por banco de destino)."""
+    db_id = hashlib.md5(str(engine.url).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(settings.LOAD_STATE_PATH, f"{table_name}.{db_id}.pkl")
+
+def load_snapshot(table_name, engine):
+    """Carrega os fingerprints da última carga, ou None se não houver."""
+    path = _snapshot_path(table_name, engine)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"Aviso: snapshot de carga '{path}' ilegível ({e}). Ignorando.")
+        return None
+
+def save_snapshot(df, table_name, engine, key_columns=None):
+    """Grava os fingerprints do DataFrame carregado, base da próxima carga incremental."""
+    if key_columns is None:
+        key_columns = settings.PRIMARY_KEYS[table_name]
+    save_fingerprints(row_fingerprints(df, key_columns), table_name, engine)
+
+def save_fingerprints(fingerprints, table_name, engine):
+    """Grava fingerprints já calculados (ex: acumulados bloco a bloco numa carga em streaming)."""
+    os.makedirs(settings.LOAD_STATE_PATH, exist_ok=True)
+    path = _snapshot_path(table_name, engine)
+    tmp_path = f"{path}.tmp"
+    fingerprints.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+def clear_snapshot(table_name, engine):
+    """Descarta os fingerprints da tabela (a próxima carga incremental consultará o banco)."""
+    path = _snapshot_path(table_name, engine)
+    if os.path.exists(path):
+        os.remove(path)
+
+def compute_delta(df, key_columns, previous):
+    """
+    Compara o DataFrame novo com os fingerprints da carga anterior.
+    Retorna (linhas_a_inserir, linhas_a_atualizar, chaves_a_remover).
+    Sem carga anterior (previous=None), todas as linhas são tratadas como upsert e as remoções
+    ficam a cargo de quem chama (ver _stale_keys_from_db).
+    """
+    current = row_fingerprints(df, key_columns)
+    if previous is None:
+        return df, df.iloc[0:0], None
+
+    is_new, is_changed = changed_rows(current, previous)
+    return df[is_new], df[is_changed], removed_keys(current, previous)
+
+def changed_rows(current, previous):
+    """
+    Compara fingerprints novos com os anteriores (ambos de row_fingerprints) pela chave primária.
+    Retorna as máscaras (linhas novas, linhas alteradas), alinhadas com 'current'.
+    """
+    positions = previous.index.get_indexer(current.index) # Consulta à tabela hash das chaves anteriores
+    is_new = positions < 0
+    is_changed = ~is_new
+    is_changed[is_changed] = current.to_numpy()[is_changed] != previous.to_numpy()[positions[is_changed]]
+    return is_new, is_changed
+
+def removed_keys(current, previous):
+    """Chaves dos fingerprints anteriores que não existem mais nos novos."""
+    return previous.index[~previous.index.isin(current.index)]
+
+def _stale_keys_from_db(connection, table_name, key_columns, df):
+    """Chaves presentes no banco que não existem mais no DataFrame novo."""
+    quote = connection.dialect.identifier_preparer.quote
+    columns = ", ".join(quote(col) for col in key_columns)
+    existing = pd.read_sql(text(f"SELECT {columns} FROM {quote(table_name)}"), connection)
+    if len(key_columns) == 1:
+        db_keys = pd.Index(existing[key_columns[0]].to_numpy())
+        new_keys = pd.Index(df[key_columns[0]].to_numpy())
+    else:
+        db_keys = pd.MultiIndex.from_frame(existing[key_columns])
+        new_keys = pd.MultiIndex.from_frame(df[key_columns])
+    return db_keys[~db_keys.isin(new_keys)]
+
+def _records(df, dialect_name):
+    """
+    Converte o DataFrame em lista de dicionários, com nulos como None.
+    No SQLite, que não aceita Timestamp como parâmetro, datas viram texto no mesmo formato gravado pelo to_sql.
+    """
+    records = df.astype(object)
+    if dialect_name == 'sqlite':
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                records[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return records.where(df.notna(), None).to_dict('records')
+
+def build_upsert_statement(dialect_name, table_name, columns, key_columns):
+    """
+    Monta o INSERT com resolução de conflito na chave primária, no dialeto do SGBD:
+    ON CONFLICT ... DO UPDATE (PostgreSQL/SQLite) ou ON DUPLICATE KEY UPDATE (MySQL).
+    A tabela é declarada sem tipos para que os valores sigam direto ao driver.
+    """
+    target = sql_table(table_name, *[sql_column(col) for col in columns])
+    value_columns = [col for col in columns if col not in key_columns]
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(target)
+        return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in value_columns})
+    else:
+        raise ValueError(f"Carga incremental não suportada para o SGBD '{dialect_name}'.")
+    stmt = insert(target)
+    if not value_columns:
+        return stmt.on_conflict_do_nothing(index_elements=key_columns)
+    return stmt.on_conflict_do_update(index_elements=key_columns,
+                                      set_={col: stmt.excluded[col] for col in value_columns})
+
+def upsert_rows(connection, df, table_name, key_columns, chunksize=None):
+    """Aplica inserções/atualizações em lotes de 'chunksize' linhas."""
+    if df.empty:
+        return
+    if chunksize is None:
+        chunksize = settings.LOAD_CHUNKSIZE
+    stmt = build_upsert_statement(connection.dialect.name, table_name, list(df.columns), key_columns)
+    for start in range(0, len(df), chunksize):
+        connection.execute(stmt, _records(df.iloc[start:start + chunksize], connection.dialect.name))
+
+def delete_rows(connection, table_name, key_columns, keys, chunksize=None):
+    """Remove as linhas cujas chaves primárias estão em 'keys', em lotes."""
+    if keys is None or len(keys) == 0:
+        return
+    if chunksize is None:
+        chunksize = settings.LOAD_CHUNKSIZE
+    target = sql_table(table_name, *[sql_column(col) for col in key_columns])
+    for start in range(0, len(keys), chunksize):
+        batch = keys[start:start + chunksize].tolist()
+        if len(key_columns) == 1:
+            condition = target.c[key_columns[0]].in_(batch)
+        else:
+            condition = tuple_(*[target.c[col] for col in key_columns]).in_(batch)
+        connection.execute(target.delete().where(condition))
+
+def _changed_keys(delta, key_columns):
+    """Chaves primárias inseridas, atualizadas ou removidas de um delta (só chaves simples)."""
+    inserted, updated, deleted = delta
+    if len(key_columns) != 1:
+        return None
+    key = key_columns[0]
+    return inserted[key].tolist() + updated[key].tolist() + deleted.tolist()
+
+def incremental_load(dataframes, engine, table_order=None, defer_foreign_keys=False):
+    """
+    Carga incremental: compara cada DataFrame transformado com o que já foi carregado
+    e aplica somente inserções, atualizações e remoções, numa única transação.
+    Inserções/atualizações seguem a ordem das chaves estrangeiras (pais antes de results);
+    remoções seguem a ordem inversa. Como nada é truncado, as tabelas continuam legíveis
+    (com o conteúdo anterior) até o commit.
+    As tabelas de resumo são atualizadas na mesma transação, só nos anos afetados pelas alterações
+    (ou por completo, se alguma tabela não tinha snapshot da carga anterior).
+    'dataframes' é um dicionário {nome_do_conjunto: DataFrame transformado}.
+    Com defer_foreign_keys=True (dados já validados), ver load_transaction.
+    Retorna um dicionário {tabela: {'inserted', 'updated', 'deleted'}}.
+    """
+    if table_order is None:
+        table_order = settings.LOAD_ORDER
+    deltas = {}
+    for name in table_order:
+        df = dataframes.get(name)
+        if df is None:
+            print(f"DataFrame para a tabela '{settings.TABLE_NAMES[name]}' está vazio. Tabela mantida como está.")
+            continue
+        table_name = settings.TABLE_NAMES[name]
+        deltas[name] = compute_delta(df, settings.PRIMARY_KEYS[name], load_snapshot(table_name, engine))
+    full_refresh = any(deleted is None for _, _, deleted in deltas.values())
+
+    stats = {}
+    with load_transaction(engine, defer_foreign_keys) as connection:
+        if not full_refresh:
+            changed_keys = {name: _changed_keys(delta, settings.PRIMARY_KEYS[name]) for name, delta in deltas.items()}
+            years = summaries.touched_years(connection, changed_keys) # Anos afetados no estado anterior
+        for name in table_order:
+            if name not in deltas:
+                continue
+            table_name = settings.TABLE_NAMES[name]
+            key_columns = settings.PRIMARY_KEYS[name]
+            inserted, updated, deleted = deltas[name]
+            if deleted is None:
+                deleted = _stale_keys_from_db(connection, table_name, key_columns, dataframes[name])
+                deltas[name] = (inserted, updated, deleted)
+            upsert_rows(connection, pd.concat([inserted, updated]), table_name, key_columns)
+        for name in reversed(table_order):
+            if name not in deltas:
+                continue
+            inserted, updated, deleted = deltas[name]
+            delete_rows(connection, settings.TABLE_NAMES[name], settings.PRIMARY_KEYS[name], deleted)
+            stats[settings.TABLE_NAMES[name]] = {
+                'inserted': len(inserted), 'updated': len(updated), 'deleted': len(deleted)
+            }
+        if full_refresh:
+            summaries.refresh_summaries(connection)
+        else:
+            years |= summaries.touched_years(connection, changed_keys) # ... e no estado novo
+            summaries.refresh_summaries(connection, years)
+
+    for name in deltas:
+        table_name = settings.TABLE_NAMES[name]
+        save_snapshot(dataframes[name], table_name, engine)
+        s = stats[table_name]
+        print(f"Tabela '{table_name}': {s['inserted']} inseridas, {s['updated']} atualizadas, {s['deleted']} removidas.")
+    return stats
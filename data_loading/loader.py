@@ -1,17 +1,125 @@
 # data_loading/loader.py
-from sqlalchemy import create_engine, text, types as sql_types
+from sqlalchemy import create_engine, event, text, types as sql_types
+from sqlalchemy.engine import Engine, make_url
 from config import settings
+from instrumentation.metrics import instrumented, rows_of
+import contextlib
+import io
+import re
+import threading
+import time
 import pandas as pd
 
-def get_db_engine():
-    """Retorna uma engine SQLAlchemy para a conexão com o banco."""
-    if not settings.DB_STRING:
+# Engines já criadas, por string de conexão: uma por processo, reaproveitando o pool de conexões
+_engines = {}
+_engines_lock = threading.Lock()
+
+def _engine_options(url):
+    """Opções de pool e atalhos de executemany específicos de cada driver."""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    is_memory_sqlite = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+    if not is_memory_sqlite: # O SQLite em memória usa um pool de conexão única, sem dimensionamento
+        options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                       pool_recycle=settings.DB_POOL_RECYCLE)
+    if url.drivername == 'postgresql+psycopg2':
+        # INSERTs de várias linhas com VALUES e, nos demais comandos, execute_batch
+        options["executemany_mode"] = "values_plus_batch"
+    elif url.drivername == 'mssql+pyodbc':
+        options["fast_executemany"] = True
+    return options
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    """
+    Modo WAL no SQLite: leitores não bloqueiam a carga (e vice-versa). Ao contrário do synchronous
+    (restaurado por load_transaction), o journal_mode é persistente: o arquivo do banco continua em
+    WAL depois do pipeline, para qualquer programa que o abra (ver SQLITE_BULK_PRAGMAS no README).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+def get_db_engine(db_string=None):
+    """
+    Retorna a engine SQLAlchemy para a conexão com o banco.
+    A engine é criada uma única vez por processo (e por string de conexão) e reaproveitada,
+    com o pool dimensionado por DB_POOL_SIZE/DB_MAX_OVERFLOW e pre-ping das conexões.
+    """
+    if db_string is None:
+        db_string = settings.DB_STRING
+    if not db_string:
         raise ValueError("String de conexão com o banco (DB_STRING) não configurada.")
-    
-    return create_engine(settings.DB_STRING)
 
-def truncate_tables(engine, table_order=None):
-    """Trunca as tabelas especificadas para evitar duplicidade."""
+    with _engines_lock:
+        engine = _engines.get(db_string)
+        if engine is None:
+            url = make_url(db_string)
+            engine = create_engine(url, **_engine_options(url))
+            if engine.name == 'sqlite' and settings.SQLITE_BULK_PRAGMAS and url.database not in (None, '', ':memory:'):
+                event.listen(engine, "connect", _enable_sqlite_wal)
+            _engines[db_string] = engine
+    return engine
+
+def dispose_engines():
+    """Fecha as conexões de todas as engines criadas por get_db_engine."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+@contextlib.contextmanager
+def load_transaction(engine, defer_foreign_keys=False):
+    """
+    Abre uma conexão e uma única transação para uma carga inteira (truncate + todas as tabelas).
+    Se qualquer etapa falhar, tudo é desfeito: nenhuma tabela fica vazia ou carregada pela metade.
+    No SQLite, desliga o fsync (PRAGMA synchronous=OFF) durante a carga e o restaura ao final.
+    Com defer_foreign_keys=True (dados já validados, ver data_validation/validator.py), as chaves
+    estrangeiras são verificadas só no commit (PostgreSQL, para as constraints DEFERRABLE, e SQLite)
+    ou não são verificadas durante a carga (MySQL, que não adia verificações).
+    """
+    with engine.connect() as connection:
+        bulk_pragmas = engine.name == 'sqlite' and settings.SQLITE_BULK_PRAGMAS
+        disable_fk_checks = defer_foreign_keys and engine.name == 'mysql'
+        if bulk_pragmas:
+            previous_synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+            connection.commit()
+        if disable_fk_checks:
+            connection.exec_driver_sql("SET FOREIGN_KEY_CHECKS=0") # Vale para a sessão: restaurado ao final
+            connection.commit()
+        try:
+            with connection.begin():
+                if defer_foreign_keys and engine.name == 'postgresql':
+                    connection.exec_driver_sql("SET CONSTRAINTS ALL DEFERRED")
+                elif defer_foreign_keys and engine.name == 'sqlite':
+                    connection.exec_driver_sql("PRAGMA defer_foreign_keys=ON") # Volta a OFF no commit
+                yield connection
+        finally:
+            if disable_fk_checks:
+                connection.exec_driver_sql("SET FOREIGN_KEY_CHECKS=1")
+                connection.commit()
+            if bulk_pragmas:
+                connection.exec_driver_sql(f"PRAGMA synchronous={int(previous_synchronous)}")
+                connection.commit()
+
+@contextlib.contextmanager
+def _begin(connectable):
+    """
+    Transação para uma operação de carga: com uma engine, abre conexão e transação próprias;
+    com uma conexão (ex: de load_transaction), usa a transação já aberta, sem confirmá-la.
+    """
+    if isinstance(connectable, Engine):
+        with connectable.begin() as connection:
+            yield connection
+    else:
+        yield connectable
+
+@instrumented("truncate")
+def truncate_tables(connectable, table_order=None, raise_errors=False):
+    """
+    Trunca as tabelas especificadas para evitar duplicidade.
+    Recebe uma engine (limpeza em transação própria) ou uma conexão de load_transaction
+    (a limpeza só é confirmada junto com a carga).
+    """
     if table_order is None:
         table_order = [
             settings.TABLE_NAMES["results"],
@@ -20,51 +128,193 @@ def truncate_tables(engine, table_order=None):
             settings.TABLE_NAMES["constructors"]
         ]
         
-    with engine.connect() as connection:
-        for table_name in table_order:
-            try:
-                # RESTART IDENTITY é específico do PostgreSQL. Outros SGBDs podem usar sintaxe diferente ou não suportar.
-                # Para SQLite, TRUNCATE não é diretamente suportado, DELETE FROM é usado.
-                # CASCADE pode ser necessário se houver FKs.
-                if engine.name == 'postgresql':
-                    connection.execute(text(f"TRUNCATE TABLE {table_name} RESTART IDENTITY CASCADE;"))
-                elif engine.name == 'mysql':
-                    connection.execute(text(f"SET FOREIGN_KEY_CHECKS = 0;")) # Desabilitar checagem de FK
-                    connection.execute(text(f"TRUNCATE TABLE {table_name};"))
-                    connection.execute(text(f"SET FOREIGN_KEY_CHECKS = 1;")) # Habilitar checagem de FK
-                elif engine.name == 'sqlite':
-                    connection.execute(text(f"DELETE FROM {table_name};"))
-                    # Para resetar autoincrement em SQLite (se a tabela usa INTEGER PRIMARY KEY)
-                    # connection.execute(text(f"DELETE FROM sqlite_sequence WHERE name='{table_name}';")) # Opcional
-                else: # Fallback genérico (pode falhar com FKs)
-                    connection.execute(text(f"DELETE FROM {table_name};"))
+    in_transaction = not isinstance(connectable, Engine)
+    dialect_name = connectable.dialect.name
 
-                print(f"Tabela '{table_name}' truncada/limpa.")
-            except Exception as e:
-                print(f"Erro ao truncar/limpar tabela '{table_name}': {e}")
-                # Considerar rollback ou tratamento mais robusto aqui
-        connection.commit()
+    with _begin(connectable) as connection:
+        # MySQL: TRUNCATE recusa tabelas referenciadas por FK, então a checagem é desligada e depois
+        # restaurada ao valor anterior da sessão. Dentro de load_transaction não há toggle: com
+        # defer_foreign_keys a checagem já está desligada até o fim da carga e, sem ele, os DELETEs
+        # seguem a ordem filhas -> pais.
+        toggle_fk_checks = dialect_name == 'mysql' and not in_transaction
+        if toggle_fk_checks:
+            previous_fk_checks = connection.exec_driver_sql("SELECT @@FOREIGN_KEY_CHECKS").scalar()
+            connection.execute(text("SET FOREIGN_KEY_CHECKS = 0;")) # Desabilitar checagem de FK
+        try:
+            _clear_tables(connection, table_order, dialect_name, in_transaction, raise_errors)
+        finally:
+            if toggle_fk_checks:
+                connection.execute(text(f"SET FOREIGN_KEY_CHECKS = {int(previous_fk_checks)};"))
     print("Todas as tabelas especificadas foram limpas.")
 
+def _clear_tables(connection, table_order, dialect_name, in_transaction, raise_errors):
+    """Limpa cada tabela de table_order com o comando adequado ao SGBD."""
+    for table_name in table_order:
+        try:
+            # RESTART IDENTITY é específico do PostgreSQL. Outros SGBDs podem usar sintaxe diferente ou não suportar.
+            # Para SQLite, TRUNCATE não é diretamente suportado, DELETE FROM é usado.
+            # CASCADE pode ser necessário se houver FKs.
+            if dialect_name == 'postgresql':
+                connection.execute(text(f"TRUNCATE TABLE {table_name} RESTART IDENTITY CASCADE;"))
+            elif dialect_name == 'mysql':
+                # TRUNCATE confirma implicitamente a transação no MySQL: dentro de uma carga única, usa DELETE
+                if in_transaction:
+                    connection.execute(text(f"DELETE FROM {table_name};"))
+                else:
+                    connection.execute(text(f"TRUNCATE TABLE {table_name};"))
+            elif dialect_name == 'sqlite':
+                connection.execute(text(f"DELETE FROM {table_name};"))
+                # Para resetar autoincrement em SQLite (se a tabela usa INTEGER PRIMARY KEY)
+                # connection.execute(text(f"DELETE FROM sqlite_sequence WHERE name='{table_name}';")) # Opcional
+            else: # Fallback genérico (pode falhar com FKs)
+                connection.execute(text(f"DELETE FROM {table_name};"))
+
+            print(f"Tabela '{table_name}' truncada/limpa.")
+        except Exception as e:
+            print(f"Erro ao truncar/limpar tabela '{table_name}': {e}")
+            if raise_errors:
+                raise
+
+
+def run_sql_script(connection, path):
+    """
+    Executa um script de sql_scripts/ comando a comando, na conexão (e transação) recebida.
+    No SQLite, remove CASCADE e troca CREATE OR REPLACE VIEW por CREATE VIEW (sem suporte no dialeto).
+    """
+    with open(path, encoding='utf-8') as f:
+        script = re.sub(r'--[^\n]*', '', f.read())
+    if connection.dialect.name == 'sqlite':
+        script = script.replace(' CASCADE', '').replace('CREATE OR REPLACE VIEW', 'CREATE VIEW')
+    for statement in script.split(';'):
+        if statement.strip():
+            connection.exec_driver_sql(statement)
+
+def copy_dataframe_postgres(df, table_name, connectable, chunksize=None):
+    """
+    Carrega um DataFrame no PostgreSQL via COPY FROM STDIN.
+    O DataFrame é serializado em CSV num buffer em memória, um bloco de 'chunksize'
+    linhas por vez, de modo que a memória extra fica limitada ao tamanho do bloco.
+    Todos os blocos são enviados na mesma transação.
+    """
+    return copy_dataframes_postgres([df], table_name, connectable, chunksize)
+
+def copy_dataframes_postgres(frames, table_name, connectable, chunksize=None):
+    """
+    Versão de copy_dataframe_postgres para uma sequência (ou gerador) de DataFrames com as mesmas colunas,
+    todos enviados por COPY na mesma conexão e transação. Retorna o total de linhas carregadas.
+    """
+    if chunksize is None:
+        chunksize = settings.LOAD_CHUNKSIZE
+    quote = connectable.dialect.identifier_preparer.quote
+    total_rows = 0
+
+    with _begin(connectable) as connection:
+        # Cursor do driver (psycopg), na mesma conexão e transação do SQLAlchemy
+        cursor = connection.connection.cursor()
+        for df in frames:
+            columns = ", ".join(quote(col) for col in df.columns)
+            copy_sql = f"COPY {quote(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+            for start in range(0, len(df), chunksize):
+                buffer = io.StringIO()
+                # Valores nulos viram campos vazios, que o COPY em formato CSV interpreta como NULL
+                df.iloc[start:start + chunksize].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                if hasattr(cursor, "copy_expert"): # psycopg2
+                    cursor.copy_expert(copy_sql, buffer)
+                else: # psycopg 3
+                    with cursor.copy(copy_sql) as copy:
+                        copy.write(buffer.getvalue())
+            total_rows += len(df)
+        cursor.close()
+    return total_rows
+
+def insert_dataframe_batched(df, table_name, connectable, dtype_mapping=None, chunksize=None):
+    """
+    Carrega um DataFrame com INSERTs em lote de 'chunksize' linhas.
+    MySQL recebe INSERTs de várias linhas (method='multi'); SQLite e demais usam executemany.
+    """
+    return insert_dataframes_batched([df], table_name, connectable, dtype_mapping, chunksize)
+
+def insert_dataframes_batched(frames, table_name, connectable, dtype_mapping=None, chunksize=None):
+    """
+    Versão de insert_dataframe_batched para uma sequência (ou gerador) de DataFrames,
+    todos inseridos na mesma transação. Retorna o total de linhas carregadas.
+    """
+    if chunksize is None:
+        chunksize = settings.LOAD_CHUNKSIZE
+    method = 'multi' if connectable.dialect.name == 'mysql' else None
+    if connectable.dialect.name == 'sqlite':
+        # O tipo Time do SQLAlchemy no SQLite só aceita objetos datetime.time; a coluna é gravada como texto
+        dtype_mapping = None
+    total_rows = 0
+    with _begin(connectable) as connection:
+        for df in frames:
+            df.to_sql(table_name, connection, if_exists='append', index=False, dtype=dtype_mapping,
+                      chunksize=chunksize, method=method)
+            total_rows += len(df)
+    return total_rows
+
+@instrumented("carga", labels=lambda args: {"tabela": args["table_name"]},
+              rows_out=lambda stats: stats["rows"] if stats else 0)
+def load_dataframe_chunks_to_db(chunks, table_name, connectable, dtype_mapping=None, chunksize=None, raise_errors=False):
+    """
+    Carrega na tabela uma sequência de DataFrames (ex: blocos de um CSV lido em streaming),
+    um de cada vez, sem nunca reunir todos em memória. Usa COPY no PostgreSQL e INSERTs em lote
+    nos demais SGBDs, numa única transação. Retorna o mesmo dicionário de load_dataframe_to_db.
+    """
+    try:
+        start = time.perf_counter()
+        if connectable.dialect.name == 'postgresql':
+            total_rows = copy_dataframes_postgres(chunks, table_name, connectable, chunksize)
+        else:
+            total_rows = insert_dataframes_batched(chunks, table_name, connectable, dtype_mapping, chunksize)
+        elapsed = time.perf_counter() - start
+        rows_per_sec = total_rows / elapsed if elapsed > 0 else float('inf')
+        print(f"Dados carregados na tabela '{table_name}' em blocos. Linhas: {total_rows} ({elapsed:.2f}s, {rows_per_sec:,.0f} linhas/s)")
+        return {'table': table_name, 'rows': total_rows, 'seconds': elapsed, 'rows_per_sec': rows_per_sec}
+    except Exception as e:
+        print(f"Erro ao carregar dados na tabela '{table_name}': {e}")
+        if raise_errors:
+            raise
+        return None
 
-def load_dataframe_to_db(df, table_name, engine, dtype_mapping=None):
-    """Carrega um DataFrame para uma tabela no banco de dados."""
+@instrumented("carga", labels=lambda args: {"tabela": args["table_name"]},
+              rows_in=lambda args: rows_of(args["df"]), rows_out=lambda stats: stats["rows"] if stats else 0)
+def load_dataframe_to_db(df, table_name, connectable, dtype_mapping=None, chunksize=None, raise_errors=False):
+    """
+    Carrega um DataFrame para uma tabela no banco de dados.
+    No PostgreSQL usa COPY (copy_dataframe_postgres); nos demais SGBDs, INSERTs em lote.
+    'connectable' é uma engine (transação própria) ou uma conexão de load_transaction.
+    Retorna um dicionário com linhas, segundos e linhas/s, ou None se nada foi carregado.
+    Com raise_errors=True, erros de carga são propagados em vez de apenas exibidos.
+    """
     if df is None:
         print(f"DataFrame para a tabela '{table_name}' está vazio. Nada a carregar.")
-        return
+        return None
     if df.empty:
         print(f"DataFrame para a tabela '{table_name}' está vazio após transformações. Nada a carregar.")
-        return
+        return None
 
     try:
-        df.to_sql(table_name, engine, if_exists='append', index=False, dtype=dtype_mapping)
-        print(f"Dados carregados na tabela '{table_name}'. Linhas: {len(df)}")
+        start = time.perf_counter()
+        if connectable.dialect.name == 'postgresql':
+            copy_dataframe_postgres(df, table_name, connectable, chunksize)
+        else:
+            insert_dataframe_batched(df, table_name, connectable, dtype_mapping, chunksize)
+        elapsed = time.perf_counter() - start
+        rows_per_sec = len(df) / elapsed if elapsed > 0 else float('inf')
+        print(f"Dados carregados na tabela '{table_name}'. Linhas: {len(df)} ({elapsed:.2f}s, {rows_per_sec:,.0f} linhas/s)")
+        return {'table': table_name, 'rows': len(df), 'seconds': elapsed, 'rows_per_sec': rows_per_sec}
     except Exception as e:
         print(f"Erro ao carregar dados na tabela '{table_name}': {e}")
+        if raise_errors:
+            raise
+        return None
 
-# Mapeamento de tipo específico para a coluna 'fastestLapTime'
+# Mapeamento de tipos específicos para as colunas de tempo de volta
 results_dtype_mapping = {
-    'fastestLapTime': sql_types.Time()
+    'fastestLapTime': sql_types.Time(),
+    'fastestLapTimeMs': sql_types.Integer()
 }
 
 if __name__ == '__main__':
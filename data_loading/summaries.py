@@ -0,0 +1,119 @@
+# data_loading/summaries.py
+from sqlalchemy import bindparam, inspect, text
+from config import settings
+
+# Consultas das views de sql_scripts/create_views.sql, com um filtro opcional por ano
+# ({year_filter}/{year_filter_and}, vazios numa atualização completa).
+# Cada tabela de resumo é particionada pela coluna 'ano'.
+SUMMARY_QUERIES = {
+    "summary_driver_yearly_results": """
+        INSERT INTO summary_driver_yearly_results
+            (ano, driver_fullname, constructor_name, qtd_vitorias, qtd_pontos)
+        SELECT
+            r.year,
+            d.fullname,
+            c.name,
+            SUM(CASE WHEN res."positionOrder" = 1 THEN 1 ELSE 0 END),
+            SUM(res.points)
+        FROM results res
+        JOIN races r ON res."raceId" = r."raceId"
+        JOIN drivers d ON res."driverId" = d."driverId"
+        JOIN constructors c ON res."constructorId" = c."constructorId"
+        {year_filter}
+        GROUP BY r.year, d.fullname, c.name
+    """,
+    "summary_grand_prix_fastest_laps": """
+        INSERT INTO summary_grand_prix_fastest_laps
+            ("raceId", ano, race_date, grand_prix_name, fastest_lap_time, driver_fullname, constructor_name)
+        SELECT "raceId", ano, race_date, grand_prix_name, fastest_lap_time, driver_fullname, constructor_name
+        FROM (
+            SELECT
+                ra."raceId",
+                ra.year AS ano,
+                ra.date AS race_date,
+                ra.name AS grand_prix_name,
+                re."fastestLapTime" AS fastest_lap_time,
+                d.fullname AS driver_fullname,
+                c.name AS constructor_name,
+                ROW_NUMBER() OVER (PARTITION BY ra."raceId" ORDER BY re."fastestLapTimeMs" ASC) AS rn
+            FROM results re
+            JOIN races ra ON re."raceId" = ra."raceId"
+            JOIN drivers d ON re."driverId" = d."driverId"
+            JOIN constructors c ON re."constructorId" = c."constructorId"
+            WHERE re."fastestLapTimeMs" IS NOT NULL
+            {year_filter_and}
+        ) ranked_laps
+        WHERE rn = 1
+    """,
+}
+
+# Para cada conjunto de dados: consulta dos anos afetados por uma alteração nas chaves ':keys'
+TOUCHED_YEARS_QUERIES = {
+    "races": 'SELECT DISTINCT year FROM races WHERE "raceId" IN :keys',
+    "results": 'SELECT DISTINCT r.year FROM results res JOIN races r ON res."raceId" = r."raceId" '
+               'WHERE res."resultId" IN :keys',
+    "drivers": 'SELECT DISTINCT r.year FROM results res JOIN races r ON res."raceId" = r."raceId" '
+               'WHERE res."driverId" IN :keys',
+    "constructors": 'SELECT DISTINCT r.year FROM results res JOIN races r ON res."raceId" = r."raceId" '
+                    'WHERE res."constructorId" IN :keys',
+}
+
+def summaries_available(connection):
+    """Verifica se as tabelas de resumo existem (sql_scripts/create_summary_tables.sql já executado)."""
+    inspector = inspect(connection)
+    return all(inspector.has_table(table_name) for table_name in SUMMARY_QUERIES)
+
+def _batches(values, chunksize=None):
+    """Divide uma lista em lotes, respeitando o limite de parâmetros por comando dos SGBDs."""
+    if chunksize is None:
+        chunksize = settings.LOAD_CHUNKSIZE
+    for start in range(0, len(values), chunksize):
+        yield values[start:start + chunksize]
+
+def touched_years(connection, changed_keys):
+    """
+    Anos cujos resumos dependem das chaves alteradas, segundo o estado atual do banco.
+    'changed_keys' é um dicionário {nome_do_conjunto: chaves inseridas, atualizadas ou removidas}.
+    Chamada antes e depois de aplicar as alterações (na mesma transação), cobre tanto o ano
+    antigo quanto o novo de uma linha que mudou de corrida.
+    """
+    years = set()
+    for name, keys in changed_keys.items():
+        if name not in TOUCHED_YEARS_QUERIES or keys is None or len(keys) == 0:
+            continue
+        query = text(TOUCHED_YEARS_QUERIES[name]).bindparams(bindparam("keys", expanding=True))
+        for batch in _batches([int(key) for key in keys]):
+            years.update(row[0] for row in connection.execute(query, {"keys": batch}))
+    return years
+
+def refresh_summaries(connection, years=None):
+    """
+    Recalcula as tabelas de resumo: inteiras (years=None) ou apenas as partições dos anos informados.
+    Deve ser chamada na mesma transação da carga, para que os painéis nunca vejam resumos
+    inconsistentes com as tabelas de origem. Sem as tabelas de resumo criadas, não faz nada.
+    """
+    if not summaries_available(connection):
+        print("Aviso: tabelas de resumo não encontradas (execute sql_scripts/create_summary_tables.sql). Atualização ignorada.")
+        return
+    for table_name, insert_sql in SUMMARY_QUERIES.items():
+        if years is None:
+            connection.execute(text(f"DELETE FROM {table_name}"))
+            connection.execute(text(insert_sql.format(year_filter="", year_filter_and="")))
+            continue
+        delete = text(f"DELETE FROM {table_name} WHERE ano IN :years").bindparams(
+            bindparam("years", expanding=True))
+        insert = text(insert_sql.format(year_filter="WHERE r.year IN :years",
+                                        year_filter_and="AND ra.year IN :years")).bindparams(
+            bindparam("years", expanding=True))
+        for batch in _batches(sorted(years)):
+            connection.execute(delete, {"years": batch})
+            connection.execute(insert, {"years": batch})
+    if years is None:
+        print("Tabelas de resumo recalculadas por completo.")
+    else:
+        print(f"Tabelas de resumo atualizadas: {len(years)} ano(s) recalculado(s).")
+
+def refresh_all(engine):
+    """Recalcula todas as tabelas de resumo numa transação própria (após uma carga completa)."""
+    with engine.begin() as connection:
+        refresh_summaries(connection)
@@ -0,0 +1,81 @@
+# data_transformation/compaction.py
+import numpy as np
+import pandas as pd
+from config import settings
+from instrumentation.metrics import instrumented, first_arg_rows, rows_of
+
+# Tipos inteiros do menor para o maior: (numpy, nulável do pandas)
+_INT_TYPES = [(np.int8, "Int8"), (np.int16, "Int16"), (np.int32, "Int32"), (np.int64, "Int64")]
+
+def _pyarrow_available():
+    try:
+        import pyarrow # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _smallest_int_type(values, nullable):
+    """Menor tipo inteiro (com sinal) em que cabem todos os valores não nulos."""
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for numpy_type, nullable_type in _INT_TYPES:
+        info = np.iinfo(numpy_type)
+        if info.min <= low and high <= info.max:
+            return nullable_type if nullable else numpy_type
+    return "Int64" if nullable else np.int64
+
+def _compact_column(series, categorical_max_ratio):
+    """
+    Tipo compacto de uma coluna, ou None se ela já estiver no menor tipo possível.
+    Inteiros: menor largura que comporta os valores. Floats só com valores inteiros e nulos ('\\N'):
+    inteiro nulável. Texto: categoria quando há muitas repetições, senão string do pyarrow.
+    """
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_integer_dtype(dtype):
+        nullable = pd.api.types.is_extension_array_dtype(dtype)
+        values = series.dropna()
+        return _smallest_int_type(values.to_numpy(dtype=np.int64), nullable)
+    if pd.api.types.is_float_dtype(dtype):
+        values = series.dropna().to_numpy()
+        if len(values) < len(series) and np.array_equal(values, np.round(values)):
+            return _smallest_int_type(values, nullable=True)
+        return None
+    if dtype == object:
+        values = series.dropna()
+        if not pd.api.types.is_string_dtype(values) or values.map(type).ne(str).any():
+            return None # Coluna mista (ex: datas como objetos): mantida como está
+        if len(series) and series.nunique() / len(series) <= categorical_max_ratio:
+            return "category"
+        if _pyarrow_available():
+            return "string[pyarrow]"
+    return None
+
+def compact_dtypes(df, categorical_max_ratio=None):
+    """
+    Converte as colunas do DataFrame para os tipos mais econômicos que representam exatamente os
+    mesmos valores (ver _compact_column). Os valores gravados no banco e os fingerprints da carga
+    incremental não mudam. Retorna um novo DataFrame; o original não é alterado.
+    """
+    if categorical_max_ratio is None:
+        categorical_max_ratio = settings.COMPACT_CATEGORICAL_MAX_RATIO
+    conversions = {}
+    for col in df.columns:
+        target = _compact_column(df[col], categorical_max_ratio)
+        if target is not None and pd.api.types.pandas_dtype(target) != df[col].dtype:
+            conversions[col] = target
+    return df.astype(conversions) if conversions else df
+
+def memory_bytes(df):
+    """Memória ocupada pelo DataFrame, incluindo o conteúdo das strings."""
+    return int(df.memory_usage(deep=True).sum())
+
+@instrumented("compactacao", labels=lambda args: {"conjunto": args["name"]}, rows_in=first_arg_rows, rows_out=rows_of)
+def compact_transformed(df, name):
+    """Compacta um DataFrame transformado e exibe a memória antes e depois."""
+    before = memory_bytes(df)
+    compacted_df = compact_dtypes(df)
+    after = memory_bytes(compacted_df)
+    reduction = (1 - after / before) * 100 if before else 0
+    print(f"Memória de '{name}': {before / 1024:.1f} KB -> {after / 1024:.1f} KB (-{reduction:.0f}%).")
+    return compacted_df
@@ -1,6 +1,10 @@
 # data_transformation/transformer.py
 import pandas as pd
+from config import settings
+from data_transformation import compaction
+from instrumentation.metrics import instrumented, first_arg_rows, rows_of
 
+@instrumented("transformacao", labels=lambda args: {"conjunto": "constructors"}, rows_in=first_arg_rows, rows_out=rows_of)
 def transform_constructors_df(df_constructors):
     """Transforma o DataFrame de constructors."""
     if df_constructors is None: return None
@@ -9,6 +13,7 @@ def transform_constructors_df(df_constructors):
     print("DataFrame 'constructors' transformado.")
     return transformed_df
 
+@instrumented("transformacao", labels=lambda args: {"conjunto": "drivers"}, rows_in=first_arg_rows, rows_out=rows_of)
 def transform_drivers_df(df_drivers):
     """Transforma o DataFrame de drivers."""
     if df_drivers is None: return None
@@ -18,6 +23,7 @@ def transform_drivers_df(df_drivers):
     print("DataFrame 'drivers' transformado.")
     return transformed_df
 
+@instrumented("transformacao", labels=lambda args: {"conjunto": "races"}, rows_in=first_arg_rows, rows_out=rows_of)
 def transform_races_df(df_races):
     """Transforma o DataFrame de races."""
     if df_races is None: return None
@@ -28,38 +34,88 @@ def transform_races_df(df_races):
     print("DataFrame 'races' transformado.")
     return transformed_df
 
-def transform_results_df(df_results):
-    """Transforma o DataFrame de results."""
-    if df_results is None: return None
+def parse_lap_time_ms(lap_times):
+    """
+    Converte tempos de volta no formato do Ergast ("1:27.452") em milissegundos inteiros (87452),
+    numa única passada vetorizada. Valores nulos ou fora do formato viram <NA> (tipo Int64).
+    """
+    # Prefixo de horas para o parser de durações do pandas (implementado em C): "00:1:27.452"
+    durations = pd.to_timedelta('00:' + lap_times.astype(object).where(lap_times.notna(), None), errors='coerce')
+    return (durations.dt.total_seconds() * 1000).round().astype('Int64')
+
+RESULTS_REQUIRED_COLS = ['resultId', 'raceId', 'driverId', 'constructorId', 'positionOrder', 'points', 'fastestLapTime']
+RESULTS_INT_COLS = ['resultId', 'raceId', 'driverId', 'constructorId', 'positionOrder']
+
+def _transform_results(df_results):
+    """Aplica a transformação de results (sem mensagens). Retorna None se faltarem colunas."""
     # Renomear 'raceld' para 'raceId' se necessário (verificar nome da coluna no CSV)
     if 'raceld' in df_results.columns and 'raceId' not in df_results.columns:
-        df_results.rename(columns={'raceld': 'raceId'}, inplace=True)
-        
-    required_cols = ['resultId', 'raceId', 'driverId', 'constructorId', 'positionOrder', 'points', 'fastestLapTime']
+        df_results = df_results.rename(columns={'raceld': 'raceId'})
+
     # Checar se todas as colunas existem
-    if not all(col in df_results.columns for col in required_cols):
-        print(f"Erro: Colunas esperadas não encontradas no DataFrame 'results'. Esperadas: {required_cols}, Encontradas: {df_results.columns.tolist()}")
+    if not all(col in df_results.columns for col in RESULTS_REQUIRED_COLS):
+        print(f"Erro: Colunas esperadas não encontradas no DataFrame 'results'. Esperadas: {RESULTS_REQUIRED_COLS}, Encontradas: {df_results.columns.tolist()}")
         return None
 
-    transformed_df = df_results[required_cols].copy()
-    
-    transformed_df['resultId'] = transformed_df['resultId'].astype(int)
-    transformed_df['raceId'] = transformed_df['raceId'].astype(int)
-    transformed_df['driverId'] = transformed_df['driverId'].astype(int)
-    transformed_df['constructorId'] = transformed_df['constructorId'].astype(int)
-    transformed_df['positionOrder'] = transformed_df['positionOrder'].astype(int)
-    
+    # Uma única conversão (e uma única cópia) para todas as colunas inteiras
+    transformed_df = df_results[RESULTS_REQUIRED_COLS].astype({col: int for col in RESULTS_INT_COLS})
+
     # Tratar '\N' como NaN antes de converter para float e depois int
-    transformed_df['points'] = pd.to_numeric(transformed_df['points'].replace({'\\N': pd.NA}), errors='coerce').fillna(0).astype(int)
-    
-    transformed_df['fastestLapTime'] = transformed_df['fastestLapTime'].replace({'\\N': None})
-    # A conversão para o tipo TIME do SQL será feita pelo SQLAlchemy ou pelo SGBD
-    print("DataFrame 'results' transformado.")
+    # (só necessário quando a coluna veio como texto; a camada de ingestão já entrega números)
+    points = transformed_df['points']
+    if not pd.api.types.is_numeric_dtype(points):
+        points = pd.to_numeric(points.replace({'\\N': pd.NA}), errors='coerce')
+    transformed_df['points'] = points.fillna(0).astype(int)
+
+    # '\\N' e nulos do parse (NaN/None, conforme o engine de leitura) viram sempre None
+    lap_times = transformed_df['fastestLapTime']
+    transformed_df['fastestLapTime'] = lap_times.where(lap_times.notna() & (lap_times != '\\N'), None)
+    # Tempo de volta em milissegundos inteiros: ordenável sem conversão para TIME (ver view_grand_prix_fastest_laps)
+    transformed_df['fastestLapTimeMs'] = parse_lap_time_ms(transformed_df['fastestLapTime'])
+    return transformed_df
+
+@instrumented("transformacao", labels=lambda args: {"conjunto": "results"}, rows_in=first_arg_rows, rows_out=rows_of)
+def transform_results_df(df_results):
+    """Transforma o DataFrame de results."""
+    if df_results is None: return None
+    transformed_df = _transform_results(df_results)
+    if transformed_df is not None:
+        print("DataFrame 'results' transformado.")
+    return transformed_df
+
+def transform_results_chunks(chunks):
+    """
+    Transforma results em streaming: recebe um iterável de blocos (ex: reader.read_dataset_chunks)
+    e produz cada bloco transformado, com o mesmo resultado de transform_results_df por linha.
+    Só um bloco de linhas fica em memória por vez, qualquer que seja o tamanho do arquivo.
+    """
+    for chunk in chunks:
+        transformed_chunk = _transform_results(chunk)
+        if transformed_chunk is None:
+            raise ValueError("Bloco de 'results' sem as colunas esperadas.")
+        yield transformed_chunk
+
+# Função de transformação de cada conjunto de dados
+TRANSFORMS = {
+    "constructors": transform_constructors_df,
+    "drivers": transform_drivers_df,
+    "races": transform_races_df,
+    "results": transform_results_df,
+}
+
+def transform_dataset(name, file_path=None):
+    """
+    Lê um conjunto de dados pela camada de ingestão (usando o staging colunar, se habilitado)
+    e aplica a transformação correspondente, com os tipos compactados (se settings.COMPACT_DTYPES).
+    """
+    from data_ingestion import reader
+    transformed_df = TRANSFORMS[name](reader.read_dataset(name, file_path))
+    if transformed_df is not None and settings.COMPACT_DTYPES:
+        transformed_df = compaction.compact_transformed(transformed_df, name)
     return transformed_df
 
 if __name__ == '__main__':
     # Teste rápido (requer arquivos CSV na pasta de extração)
-    from config import settings
     import os
     
     print("Testando o módulo de transformação...")
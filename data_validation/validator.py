@@ -0,0 +1,167 @@
+# data_validation/validator.py
+import os
+import numpy as np
+import pandas as pd
+from config import settings
+from instrumentation import metrics
+from instrumentation.metrics import instrumented
+
+# Colunas obrigatórias além das chaves primárias e estrangeiras (sempre obrigatórias)
+NOT_NULL_COLUMNS = {
+    "races": ["year"],
+}
+
+# Faixas de valores aceitas: coluna -> (mínimo, máximo); None = sem limite. Nulos não são verificados aqui.
+INT32_MAX = 2**31 - 1 # Colunas INT do banco
+VALUE_RANGES = {
+    "constructors": {"constructorId": (1, INT32_MAX)},
+    "drivers": {"driverId": (1, INT32_MAX)},
+    "races": {"raceId": (1, INT32_MAX), "year": (1950, 2100)},
+    "results": {
+        "resultId": (1, INT32_MAX),
+        "positionOrder": (1, INT32_MAX),
+        "points": (0, INT32_MAX),
+        "fastestLapTimeMs": (1, INT32_MAX),
+    },
+}
+
+class _SeenKeys:
+    """
+    Chaves primárias já aceitas em blocos anteriores (modo streaming).
+    Chaves inteiras simples ficam num mapa de bits denso (consulta vetorizada);
+    chaves compostas, num conjunto de tuplas. O estado cresce com a tabela: 1 byte por id até a
+    maior chave (mapa de bits) ou uma tupla por linha aceita (conjunto).
+    """
+
+    def __init__(self, key_columns):
+        self.key_columns = key_columns
+        self.bitmap = np.zeros(0, dtype=bool) if len(key_columns) == 1 else None
+        self.keys = set()
+
+    def contains(self, df):
+        if self.bitmap is not None:
+            keys = df[self.key_columns[0]].to_numpy(dtype=np.int64)
+            found = np.zeros(len(keys), dtype=bool)
+            in_range = keys < len(self.bitmap)
+            found[in_range] = self.bitmap[keys[in_range]]
+            return found
+        return np.fromiter((key in self.keys for key in df[self.key_columns].itertuples(index=False, name=None)),
+                           dtype=bool, count=len(df))
+
+    def add(self, df):
+        if self.bitmap is not None:
+            keys = df[self.key_columns[0]].to_numpy(dtype=np.int64)
+            if len(keys) and keys.max() >= len(self.bitmap):
+                self.bitmap = np.concatenate([self.bitmap, np.zeros(int(keys.max()) + 1 - len(self.bitmap), dtype=bool)])
+            self.bitmap[keys] = True
+        else:
+            self.keys.update(df[self.key_columns].itertuples(index=False, name=None))
+
+def key_index(df, name):
+    """Índice (tabela hash) das chaves primárias de uma tabela pai, para as consultas de chave estrangeira."""
+    key_columns = settings.PRIMARY_KEYS[name]
+    if len(key_columns) == 1:
+        return pd.Index(df[key_columns[0]].to_numpy())
+    return pd.MultiIndex.from_frame(df[key_columns])
+
+def _violations(df, name, parent_indexes, seen_keys=None):
+    """
+    Verifica todas as regras de uma vez sobre o DataFrame inteiro (operações vetorizadas).
+    Retorna (máscara das linhas rejeitadas, motivo de cada linha rejeitada — o primeiro que falhou).
+    """
+    key_columns = settings.PRIMARY_KEYS[name]
+    foreign_keys = settings.FOREIGN_KEYS.get(name, {})
+    bad = np.zeros(len(df), dtype=bool)
+    reasons = np.full(len(df), None, dtype=object)
+
+    def reject(mask, reason):
+        new = mask & ~bad
+        reasons[new] = reason
+        bad[new] = True
+
+    for col in dict.fromkeys(key_columns + list(foreign_keys) + NOT_NULL_COLUMNS.get(name, [])):
+        reject(df[col].isna().to_numpy(), f"nulo em {col}")
+    for col, (low, high) in VALUE_RANGES.get(name, {}).items():
+        values = df[col]
+        out_of_range = pd.Series(False, index=df.index)
+        if low is not None:
+            out_of_range |= values < low
+        if high is not None:
+            out_of_range |= values > high
+        reject(out_of_range.fillna(False).to_numpy(dtype=bool), f"{col} fora da faixa [{low}, {high}]")
+    for col, parent in foreign_keys.items():
+        if parent not in parent_indexes: # Tabela pai fora desta validação: o banco verifica
+            continue
+        # get_indexer consulta a tabela hash do índice do pai, construída uma única vez
+        missing = parent_indexes[parent].get_indexer(df[col].to_numpy()) < 0
+        reject(missing, f"{col} sem correspondente em {settings.TABLE_NAMES[parent]}")
+
+    # Chave primária duplicada: a primeira ocorrência válida é mantida
+    duplicated = np.zeros(len(df), dtype=bool)
+    duplicated[~bad] = df.loc[~bad].duplicated(subset=key_columns, keep="first").to_numpy()
+    if seen_keys is not None:
+        duplicated[~bad] |= seen_keys.contains(df.loc[~bad])
+    reject(duplicated, f"chave primária duplicada ({', '.join(key_columns)})")
+    return bad, reasons
+
+def quarantine_dir():
+    """Pasta da quarentena da execução atual (uma por execução do pipeline)."""
+    return os.path.join(settings.QUARANTINE_PATH, metrics.current_run_id())
+
+def _quarantine(rejected, name):
+    """Acrescenta as linhas rejeitadas (com a coluna 'motivo') ao arquivo de quarentena da tabela."""
+    path = os.path.join(quarantine_dir(), f"{settings.TABLE_NAMES[name]}.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rejected.to_csv(path, mode="a", index=False, header=not os.path.exists(path))
+    return path
+
+def _split(df, name, parent_indexes, seen_keys=None):
+    """Separa as linhas válidas das rejeitadas; as rejeitadas vão para a quarentena."""
+    bad, reasons = _violations(df, name, parent_indexes, seen_keys)
+    if not bad.any():
+        return df, {}
+    rejected = df.loc[bad].assign(motivo=reasons[bad])
+    path = _quarantine(rejected, name)
+    counts = rejected["motivo"].value_counts().to_dict()
+    summary = ", ".join(f"{reason}: {count}" for reason, count in counts.items())
+    print(f"Validação de '{name}': {int(bad.sum())} de {len(df)} linhas em quarentena ({summary}) -> '{path}'.")
+    return df.loc[~bad], counts
+
+@instrumented("validacao", rows_in=lambda args: sum(len(df) for df in args["frames"].values() if df is not None),
+              rows_out=lambda result: sum(len(df) for df in result[0].values()))
+def validate_frames(frames, table_order=None, parent_indexes=None):
+    """
+    Valida os DataFrames transformados antes da carga, na ordem das chaves estrangeiras:
+    chaves primárias únicas e não nulas, chaves estrangeiras presentes na tabela pai
+    (já validada), colunas obrigatórias e faixas de valores. As linhas rejeitadas vão para
+    quarantine/<execução>/<tabela>.csv com o motivo; as demais seguem para a carga.
+    'parent_indexes' traz os índices (key_index) de tabelas pai validadas fora desta chamada.
+    Retorna ({conjunto: DataFrame válido}, {conjunto: {motivo: linhas rejeitadas}}).
+    """
+    if table_order is None:
+        table_order = settings.LOAD_ORDER
+    valid, rejected = {}, {}
+    parent_indexes = dict(parent_indexes or {})
+    for name in table_order:
+        df = frames.get(name)
+        if df is None:
+            continue
+        valid[name], counts = _split(df, name, parent_indexes)
+        if counts:
+            rejected[name] = counts
+        parent_indexes[name] = key_index(valid[name], name)
+    if not rejected:
+        print(f"Validação concluída: nenhuma linha rejeitada em {len(valid)} tabelas.")
+    return valid, rejected
+
+def validate_chunks(chunks, name, parent_indexes):
+    """
+    Versão em streaming de validate_frames para uma tabela lida em blocos (ex: results):
+    cada bloco é validado contra os índices das tabelas pai ('parent_indexes', de key_index)
+    e contra as chaves já vistas nos blocos anteriores. Produz apenas as linhas válidas.
+    """
+    seen_keys = _SeenKeys(settings.PRIMARY_KEYS[name])
+    for chunk in chunks:
+        valid_chunk, _ = _split(chunk, name, parent_indexes, seen_keys)
+        seen_keys.add(valid_chunk)
+        yield valid_chunk
@@ -0,0 +1,264 @@
+# instrumentation/metrics.py
+import cProfile
+import datetime
+import functools
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from config import settings
+
+# Registros da execução atual (uma execução do pipeline = um run_id)
+_lock = threading.Lock()
+_records = []
+_run_id = None
+_active_stages = 0
+# cProfile só aceita um perfil ativo por vez: etapas simultâneas ficam sem perfil
+_profile_lock = threading.Lock()
+
+def peak_rss_kb():
+    """Pico de memória residente do processo atual em KB (None fora de sistemas Unix)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # macOS reporta em bytes
+
+def io_counters():
+    """Bytes lidos e escritos pelo processo até agora (rchar/wchar do Linux), ou (None, None)."""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def _formats():
+    """Formatos de saída configurados em METRICS_FORMAT (ex: 'jsonl', 'prometheus', 'jsonl,prometheus')."""
+    return {fmt.strip() for fmt in settings.METRICS_FORMAT.split(",") if fmt.strip() and fmt.strip() != "none"}
+
+def is_enabled():
+    """A instrumentação fica desligada com METRICS_FORMAT='none'."""
+    return bool(_formats())
+
+def _new_run_id():
+    """
+    Identificador de uma nova execução: data e hora com microssegundos e o PID do processo, de modo
+    que execuções iniciadas no mesmo segundo (ou no mesmo instante, em processos diferentes) não
+    compartilhem arquivos de métricas nem a pasta da quarentena. A ordem alfabética segue a cronológica.
+    """
+    return f"{datetime.datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+
+def start_run(run_id=None):
+    """Inicia uma nova execução: descarta os registros anteriores e liga o tracemalloc, se configurado."""
+    global _run_id
+    with _lock:
+        _records.clear()
+        _run_id = run_id or _new_run_id()
+    if settings.METRICS_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return _run_id
+
+def current_run_id():
+    """Identificador da execução atual (criado na primeira chamada, se start_run não foi chamado)."""
+    global _run_id
+    with _lock:
+        if _run_id is None:
+            _run_id = _new_run_id()
+        return _run_id
+
+def get_records():
+    """Cópia dos registros da execução atual."""
+    with _lock:
+        return list(_records)
+
+def _stage_file_name(stage, labels):
+    """Nome de arquivo seguro para uma etapa e seus rótulos (ex: 'carga-results')."""
+    name = "-".join([stage] + [str(value) for value in labels.values()])
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+class _Probe:
+    """Medições de uma execução de etapa: relógio, CPU da thread, memória, E/S e perfil opcional."""
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.profiler = None
+        self.profile_path = None
+
+    def start(self):
+        global _active_stages
+        with _lock:
+            _active_stages += 1
+            first_active = _active_stages == 1
+        if tracemalloc.is_tracing() and first_active:
+            tracemalloc.reset_peak()
+        self.started_at = datetime.datetime.now().isoformat(timespec="milliseconds")
+        self.rss_before = peak_rss_kb()
+        self.read_before, self.written_before = io_counters()
+        if settings.METRICS_PROFILE and _profile_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+
+    def stop(self, rows_in, rows_out, error):
+        global _active_stages
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.thread_time() - self.cpu_start
+        if self.profiler is not None:
+            self.profiler.disable()
+            profile_dir = os.path.join(settings.METRICS_PATH, "profiles")
+            os.makedirs(profile_dir, exist_ok=True)
+            self.profile_path = os.path.join(
+                profile_dir, f"{current_run_id()}_{_stage_file_name(self.stage, self.labels)}.prof")
+            self.profiler.dump_stats(self.profile_path)
+            _profile_lock.release()
+        read_after, written_after = io_counters()
+        rss_after = peak_rss_kb()
+        with _lock:
+            _active_stages -= 1
+        return {
+            "run_id": current_run_id(),
+            "stage": self.stage,
+            "labels": self.labels,
+            "started_at": self.started_at,
+            "status": "erro" if error else "ok",
+            "error": str(error) if error else None,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "peak_rss_kb": rss_after,
+            "peak_rss_delta_kb": (rss_after - self.rss_before) if rss_after is not None else None,
+            "tracemalloc_peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+            "bytes_read": (read_after - self.read_before) if read_after is not None else None,
+            "bytes_written": (written_after - self.written_before) if written_after is not None else None,
+            "profile": self.profile_path,
+        }
+
+def record(entry):
+    """Guarda um registro e, com o formato 'jsonl', o acrescenta ao arquivo de métricas."""
+    with _lock:
+        _records.append(entry)
+        if "jsonl" in _formats():
+            os.makedirs(settings.METRICS_PATH, exist_ok=True)
+            with open(os.path.join(settings.METRICS_PATH, "etl_metrics.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def rows_of(value):
+    """Quantidade de linhas de um DataFrame (None para outros valores)."""
+    return len(value) if hasattr(value, "__len__") and hasattr(value, "columns") else None
+
+def first_arg_rows(arguments):
+    """Linhas do primeiro argumento da chamada (o DataFrame de entrada das transformações)."""
+    return rows_of(next(iter(arguments.values()), None))
+
+def instrumented(stage, labels=None, rows_in=None, rows_out=None):
+    """
+    Decorador que mede cada chamada da função como uma etapa do ETL: tempo de relógio,
+    tempo de CPU da thread, pico de RSS (e do tracemalloc, se METRICS_TRACEMALLOC),
+    bytes lidos/escritos, linhas de entrada/saída e, com METRICS_PROFILE, um perfil cProfile.
+    'labels' e 'rows_in' recebem os argumentos da chamada (dicionário nome -> valor);
+    'rows_out' recebe o retorno. Memória e E/S são do processo: com etapas em paralelo,
+    os valores incluem o que as outras etapas fizeram no mesmo intervalo.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            try:
+                call_args = signature.bind(*args, **kwargs)
+                call_args.apply_defaults()
+                stage_labels = labels(call_args.arguments) if labels else {}
+                count_in = rows_in(call_args.arguments) if rows_in else None
+            except Exception: # A medição nunca impede a chamada
+                stage_labels, count_in = {}, None
+            probe = _Probe(stage, stage_labels)
+            probe.start()
+            result, error = None, None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                count_out = None
+                if error is None and rows_out:
+                    try:
+                        count_out = rows_out(result)
+                    except Exception:
+                        pass
+                record(probe.stop(count_in, count_out, error))
+        return wrapper
+    return decorator
+
+# Métricas exportadas no formato texto do Prometheus: campo do registro -> (nome, descrição)
+PROMETHEUS_METRICS = {
+    "wall_seconds": ("etl_stage_wall_seconds", "Duração da etapa em segundos (relógio)."),
+    "cpu_seconds": ("etl_stage_cpu_seconds", "Tempo de CPU da etapa em segundos."),
+    "rows_in": ("etl_stage_rows_in", "Linhas recebidas pela etapa."),
+    "rows_out": ("etl_stage_rows_out", "Linhas produzidas ou carregadas pela etapa."),
+    "bytes_read": ("etl_stage_bytes_read", "Bytes lidos pelo processo durante a etapa."),
+    "bytes_written": ("etl_stage_bytes_written", "Bytes escritos pelo processo durante a etapa."),
+    "peak_rss_kb": ("etl_stage_peak_rss_kb", "Pico de memória residente do processo ao fim da etapa (KB)."),
+    "tracemalloc_peak_bytes": ("etl_stage_tracemalloc_peak_bytes", "Pico de memória alocada pelo Python (tracemalloc)."),
+}
+
+def _prometheus_labels(entry):
+    labels = {"stage": entry["stage"], **entry["labels"]}
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+    return ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped))
+
+def write_prometheus(records=None, path=None):
+    """
+    Grava as métricas da execução no formato texto do Prometheus (ex: para o textfile collector
+    do node_exporter). Se a mesma etapa rodou mais de uma vez, vale a última medição.
+    """
+    if records is None:
+        records = get_records()
+    if path is None:
+        path = os.path.join(settings.METRICS_PATH, "etl_metrics.prom")
+    latest = {}
+    for entry in records:
+        latest[_prometheus_labels(entry)] = entry
+
+    lines = []
+    for field, (metric, description) in PROMETHEUS_METRICS.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} gauge")
+        for label_text, entry in latest.items():
+            if entry.get(field) is not None:
+                lines.append(f"{metric}{{{label_text}}} {entry[field]}")
+    lines.append("# HELP etl_stage_failed Etapa terminou com erro (1) ou não (0).")
+    lines.append("# TYPE etl_stage_failed gauge")
+    for label_text, entry in latest.items():
+        lines.append(f"etl_stage_failed{{{label_text}}} {1 if entry['status'] == 'erro' else 0}")
+    lines.append("# HELP etl_last_run_timestamp_seconds Momento em que as métricas foram gravadas.")
+    lines.append("# TYPE etl_last_run_timestamp_seconds gauge")
+    lines.append(f"etl_last_run_timestamp_seconds {time.time():.0f}")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path) # Troca atômica: o coletor nunca lê um arquivo pela metade
+    return path
+
+def finish_run():
+    """Encerra a execução: grava o arquivo do Prometheus (se configurado) e exibe onde estão as métricas."""
+    if not is_enabled():
+        return
+    formats = _formats()
+    if "prometheus" in formats:
+        write_prometheus()
+    print(f"Métricas da execução {current_run_id()} ({', '.join(sorted(formats))}) gravadas em '{settings.METRICS_PATH}'.")
@@ -1,16 +1,276 @@
 # main_etl_pipeline.py (Corrigido)
+# Os módulos das etapas (e com eles pandas, SQLAlchemy e requests) são importados dentro das funções
+# que os usam: '--help' e a execução só da extração (--extract-only) não carregam pandas nem SQLAlchemy.
+# Regressões no tempo de importação: python -m benchmarks.check_import_time
 from config import settings
-from data_extraction import extractor
-from data_transformation import transformer
-# ---- LINHA CORRIGIDA ----
-from data_loading.loader import get_db_engine, truncate_tables, load_dataframe_to_db, results_dtype_mapping
-# -------------------------
-import pandas as pd
+from instrumentation import metrics
+from orchestration.scheduler import Task, run_dag, print_summary, SUCCESS
+import argparse
+import contextlib
 import os # Para checagem de arquivos
 
-def run_etl_pipeline():
-    """Executa o pipeline completo de ETL."""
+def _read_task(name, file_path):
+    """Tarefa de leitura de um CSV pela camada de ingestão."""
+    from data_ingestion import reader
+    def run(inputs):
+        df = reader.read_dataset(name, file_path)
+        print(f"Arquivo {name}.csv carregado para DataFrame.")
+        return df
+    return run
+
+def _transform_task(name):
+    """Tarefa de transformação; falha se a transformação não produzir DataFrame."""
+    from data_transformation import transformer, compaction
+    def run(inputs):
+        transformed_df = transformer.TRANSFORMS[name](inputs[f"ler_{name}"])
+        if transformed_df is None:
+            raise ValueError(f"Transformação de '{name}' não produziu dados.")
+        if settings.COMPACT_DTYPES:
+            transformed_df = compaction.compact_transformed(transformed_df, name)
+        return transformed_df
+    return run
+
+def _validate_task(names):
+    """Tarefa de validação: recebe os DataFrames transformados e devolve só as linhas válidas."""
+    from data_validation import validator
+    def run(inputs):
+        frames = {name: inputs[f"transformar_{name}"] for name in names}
+        valid_frames, _ = validator.validate_frames(frames)
+        return valid_frames
+    return run
+
+def _transformed_results_chunks(file_path, fingerprints, parent_frames=None, capture=None):
+    """
+    results em streaming: lê o CSV em blocos e transforma cada bloco, sem nunca ter o arquivo
+    inteiro em memória. Os fingerprints de cada bloco são acumulados para o snapshot da carga:
+    esse estado cresce com o arquivo (O(linhas), cerca de 16 bytes por linha: hash + chave), assim
+    como as chaves já vistas pela validação e o estado do CDC (ver run_etl_pipeline).
+    Com 'parent_frames' (tabelas pai já validadas), cada bloco também é validado.
+    Com 'capture' (cdc.ChangeCapture), as alterações de cada bloco vão para o delta de CDC.
+    """
+    from data_ingestion import reader
+    from data_loading import incremental
+    from data_transformation import transformer
+    from data_validation import validator
+
+    key_columns = settings.PRIMARY_KEYS["results"]
+    chunks = transformer.transform_results_chunks(reader.read_dataset_chunks("results", file_path))
+    if parent_frames is not None:
+        parent_indexes = {name: validator.key_index(df, name) for name, df in parent_frames.items()}
+        chunks = validator.validate_chunks(chunks, "results", parent_indexes)
+    for chunk in chunks:
+        chunk_fingerprints = incremental.row_fingerprints(chunk, key_columns)
+        fingerprints.append(chunk_fingerprints)
+        if capture is not None:
+            capture.add("results", chunk, chunk_fingerprints)
+        yield chunk
+    print("DataFrame 'results' transformado (em blocos).")
+
+def _load_inputs(inputs):
+    """DataFrames a carregar: os validados (tarefa validar_dados) ou, sem validação, os transformados."""
+    if "validar_dados" in inputs:
+        return inputs["validar_dados"]
+    return {name[len("transformar_"):]: df for name, df in inputs.items() if name.startswith("transformar_")}
+
+def _defer_foreign_keys():
+    """Com a validação ligada, a carga pode adiar a verificação das chaves estrangeiras."""
+    return settings.VALIDATION_ENABLED and settings.LOAD_DEFER_FOREIGN_KEYS
+
+def _full_load_task(file_paths, db_engine, stream_results):
+    """
+    Tarefa de carga completa: truncate, carga das quatro tabelas (na ordem das chaves estrangeiras)
+    e recálculo das tabelas de resumo, tudo numa única transação. Uma falha desfaz a carga inteira
+    e o banco continua com os dados anteriores. Depois do commit, as alterações em relação ao último
+    delta são publicadas como CDC (ver data_loading/cdc.py).
+    """
+    import pandas as pd
+    from data_loading import cdc, incremental, summaries
+    from data_loading.loader import (load_transaction, truncate_tables, load_dataframe_to_db,
+                                     load_dataframe_chunks_to_db, results_dtype_mapping)
+
+    def run(inputs):
+        frames = _load_inputs(inputs)
+        stats = {}
+        results_fingerprints = []
+        parent_frames = frames if settings.VALIDATION_ENABLED else None
+        with cdc.capture_changes() as capture:
+            with load_transaction(db_engine, _defer_foreign_keys()) as connection:
+                truncate_tables(connection, raise_errors=True)
+                for name in settings.LOAD_ORDER:
+                    table_name = settings.TABLE_NAMES[name]
+                    dtype_mapping = results_dtype_mapping if name == "results" else None
+                    if stream_results and name == "results":
+                        chunks = _transformed_results_chunks(file_paths[name], results_fingerprints, parent_frames, capture)
+                        stats[name] = load_dataframe_chunks_to_db(chunks, table_name, connection,
+                                                                  dtype_mapping=dtype_mapping, raise_errors=True)
+                    else:
+                        stats[name] = load_dataframe_to_db(frames[name], table_name, connection,
+                                                           dtype_mapping=dtype_mapping, raise_errors=True)
+                summaries.refresh_summaries(connection)
+
+            # Registra o estado carregado, base para uma próxima execução incremental (e para o delta de CDC)
+            for name in settings.LOAD_ORDER:
+                table_name = settings.TABLE_NAMES[name]
+                if stream_results and name == "results":
+                    if results_fingerprints:
+                        incremental.save_fingerprints(pd.concat(results_fingerprints), table_name, db_engine)
+                    else:
+                        incremental.clear_snapshot(table_name, db_engine)
+                else:
+                    fingerprints = incremental.row_fingerprints(frames[name], settings.PRIMARY_KEYS[name])
+                    incremental.save_fingerprints(fingerprints, table_name, db_engine)
+                    if capture is not None:
+                        capture.add(name, frames[name], fingerprints)
+        return stats
+    return run
+
+def build_pipeline_tasks(file_paths, db_engine, incremental_mode=False, stream_results=False):
+    """
+    Monta o grafo de tarefas do pipeline. Para cada conjunto de dados: ler -> transformar,
+    em paralelo; com settings.VALIDATION_ENABLED, uma tarefa validar_dados recebe todas as
+    transformações e separa as linhas inválidas (quarentena); a carga espera a validação.
+    Na carga completa, uma única tarefa trunca e recarrega as quatro tabelas e recalcula
+    as tabelas de resumo numa só transação (ver _full_load_task).
+    No modo incremental, uma única tarefa aplica as diferenças de todas as tabelas (numa transação)
+    e atualiza os resumos só dos anos afetados.
+    Com stream_results=True (só na carga completa), results é lido, transformado, validado e
+    carregado em blocos dentro da tarefa de carga.
+    Nos dois modos, com settings.CDC_ENABLED, a tarefa de carga publica depois do commit o delta
+    das linhas inseridas, atualizadas e removidas desde o último delta (data_loading/cdc.py).
+    """
+    stream_results = stream_results and not incremental_mode
+    tasks = []
+    for name in settings.LOAD_ORDER:
+        if stream_results and name == "results":
+            continue
+        tasks.append(Task(f"ler_{name}", _read_task(name, file_paths[name])))
+        tasks.append(Task(f"transformar_{name}", _transform_task(name), depends_on=[f"ler_{name}"]))
+
+    # Validação entre a transformação e a carga: linhas inválidas vão para a quarentena
+    transformed = [name for name in settings.LOAD_ORDER if not (stream_results and name == "results")]
+    load_depends_on = [f"transformar_{name}" for name in transformed]
+    if settings.VALIDATION_ENABLED:
+        tasks.append(Task("validar_dados", _validate_task(transformed), depends_on=load_depends_on))
+        load_depends_on = ["validar_dados"]
+
+    if incremental_mode:
+        from data_loading import cdc, incremental
+
+        def run_incremental(inputs):
+            print("Modo incremental: aplicando apenas as diferenças em relação à última carga.")
+            frames = _load_inputs(inputs)
+            with cdc.capture_changes() as capture:
+                stats = incremental.incremental_load(frames, db_engine, defer_foreign_keys=_defer_foreign_keys())
+                if capture is not None:
+                    for name, df in frames.items():
+                        if df is not None:
+                            capture.add(name, df)
+            return stats
+        tasks.append(Task("carga_incremental", run_incremental, depends_on=load_depends_on))
+        return tasks
+
+    # Limpar tabelas e carregar tudo numa única transação (idempotente e sem cargas pela metade)
+    tasks.append(Task("carregar_tabelas", _full_load_task(file_paths, db_engine, stream_results),
+                      depends_on=load_depends_on))
+    return tasks
+
+@contextlib.contextmanager
+def _settings_overridden(**values):
+    """Aplica configurações temporárias (ex: pastas de estado num diretório temporário) e as restaura."""
+    previous = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+def _read_tables(engine):
+    """Tabelas carregadas e de resumo de um banco, com as linhas em ordem total para comparação."""
+    import pandas as pd
+    from data_loading import summaries
+    table_names = [settings.TABLE_NAMES[name] for name in settings.LOAD_ORDER] + list(summaries.SUMMARY_QUERIES)
+    tables = {}
+    for table_name in table_names:
+        df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
+        tables[table_name] = df.sort_values(list(df.columns), ignore_index=True)
+    return tables
+
+def check_stream_parity(file_paths=None, chunksize=None):
+    """
+    Verificação repetível da carga em streaming: carrega os mesmos CSVs (por padrão, os da pasta
+    de extração) em dois bancos SQLite temporários, um com results em memória e outro em blocos de
+    'chunksize' linhas (padrão: settings.STREAM_CHUNKSIZE), e compara as tabelas e os resumos.
+    Use um 'chunksize' menor que results.csv para que a carga passe por vários blocos.
+    Estado incremental e quarentena vão para a pasta temporária e o CDC fica desligado: a
+    verificação não altera o estado das cargas reais.
+    Retorna True se todas as tabelas coincidirem; as divergências são exibidas.
+    """
+    import tempfile
+    import pandas as pd
+    from sqlalchemy import create_engine
+    from data_loading.loader import run_sql_script
+
+    if file_paths is None:
+        file_paths = {name: os.path.join(settings.EXTRACAO_PATH, f"{name}.csv") for name in settings.LOAD_ORDER}
+    with tempfile.TemporaryDirectory() as tmp_dir, _settings_overridden(
+            STREAM_CHUNKSIZE=chunksize or settings.STREAM_CHUNKSIZE, CDC_ENABLED=False,
+            LOAD_STATE_PATH=os.path.join(tmp_dir, "load_state"), QUARANTINE_PATH=os.path.join(tmp_dir, "quarantine")):
+        loaded = {}
+        for stream_results in (False, True):
+            mode = "em blocos" if stream_results else "em memória"
+            print(f"\n--- Carga com results {mode} (blocos de {settings.STREAM_CHUNKSIZE} linhas) ---")
+            engine = create_engine(f"sqlite:///{os.path.join(tmp_dir, f'stream_{stream_results}.db')}")
+            try:
+                with engine.begin() as connection:
+                    for script in ("create_tables.sql", "create_summary_tables.sql"):
+                        run_sql_script(connection, os.path.join(settings.SQL_SCRIPTS_PATH, script))
+                tasks = run_dag(build_pipeline_tasks(file_paths, engine, stream_results=stream_results))
+                failed = [task.name for task in tasks.values() if task.state != SUCCESS]
+                if failed:
+                    print_summary(tasks)
+                    print(f"Divergência: a carga com results {mode} falhou ({', '.join(failed)}).")
+                    return False
+                loaded[stream_results] = _read_tables(engine)
+            finally:
+                engine.dispose()
+
+    print("\n--- Paridade streaming x memória ---")
+    all_equal = True
+    for table_name, expected in loaded[False].items():
+        actual = loaded[True][table_name]
+        try:
+            pd.testing.assert_frame_equal(actual, expected)
+            print(f"Paridade OK: '{table_name}' ({len(actual)} linhas).")
+        except AssertionError as e:
+            all_equal = False
+            print(f"Divergência em '{table_name}': {e}")
+    return all_equal
+
+def run_etl_pipeline(incremental_mode=False, stream_results=False, year_range=None, workers=None, extract_only=False):
+    """
+    Executa o pipeline completo de ETL.
+    Leitura, transformação e carga de cada conjunto de dados rodam como tarefas de um grafo
+    de dependências (ver build_pipeline_tasks), em paralelo sempre que possível.
+    Com incremental_mode=True, em vez de truncar e recarregar tudo, aplica no banco
+    apenas as linhas inseridas, alteradas ou removidas desde a última carga.
+    Com stream_results=True, results.csv é processado em blocos de settings.STREAM_CHUNKSIZE linhas:
+    os dados em memória ficam limitados a um bloco, mas o estado por chave cresce com o arquivo
+    (O(linhas)): os fingerprints do snapshot (~16 bytes por linha, compartilhados com o delta de CDC),
+    os fingerprints do último delta de CDC (mesmo tamanho) e, com a validação, o mapa de bits das
+    chaves já vistas (1 byte por id até o maior resultId).
+    Com year_range=(inicial, final), executa por temporada (ver orchestration/seasons.py):
+    só as temporadas do intervalo são reprocessadas, em paralelo em até 'workers' processos.
+    Com extract_only=True, só baixa/verifica os CSVs (sem importar pandas nem SQLAlchemy).
+    Retorna o dicionário de tarefas com o estado final de cada uma (no modo por temporada,
+    {ano: estatísticas} das temporadas carregadas; só com a extração, {conjunto: caminho do CSV}),
+    ou None se abortado.
+    """
+    from data_extraction import extractor
+
     print("Iniciando pipeline ETL de Fórmula 1...")
+    metrics.start_run()
 
     # ETAPA 1: EXTRAÇÃO
     print("\n--- ETAPA 1: EXTRAÇÃO ---")
@@ -20,48 +280,87 @@ def run_etl_pipeline():
     for name, path in downloaded_file_paths.items():
         if not path or not os.path.exists(path):
             print(f"Erro crítico: Arquivo {name}.csv não foi baixado ou não encontrado em {path}. Abortando pipeline.")
-            return
-
-    # ETAPA 2: TRANSFORMAÇÃO
-    print("\n--- ETAPA 2: TRANSFORMAÇÃO ---")
-    dataframes_raw = {}
-    for name, file_path in downloaded_file_paths.items():
-        try:
-            dataframes_raw[name] = pd.read_csv(file_path)
-            print(f"Arquivo {name}.csv carregado para DataFrame.")
-        except Exception as e:
-            print(f"Erro ao ler {name}.csv: {e}")
-            dataframes_raw[name] = None
-
+            metrics.finish_run()
+            return None
 
-    # Aplicar transformações
-    df_constructors_tf = transformer.transform_constructors_df(dataframes_raw.get("constructors"))
-    df_drivers_tf = transformer.transform_drivers_df(dataframes_raw.get("drivers"))
-    df_races_tf = transformer.transform_races_df(dataframes_raw.get("races"))
-    df_results_tf = transformer.transform_results_df(dataframes_raw.get("results"))
+    if extract_only:
+        print("\nExtração concluída com sucesso (--extract-only: transformação e carga não executadas).")
+        metrics.finish_run()
+        return downloaded_file_paths
 
-    # ETAPA 3: CARGA
-    print("\n--- ETAPA 3: CARGA NO BANCO DE DADOS ---")
+    from data_loading.loader import get_db_engine
     db_engine = get_db_engine()
     if not db_engine:
         print("Pipeline abortado: Não foi possível obter a engine do banco de dados.")
-        return
+        metrics.finish_run()
+        return None
 
-    # Limpar tabelas antes de carregar (para idempotência)
-    truncate_tables(db_engine)
+    if year_range is not None:
+        from orchestration import seasons
+        print("\n--- ETAPAS 2 e 3: TRANSFORMAÇÃO E CARGA POR TEMPORADA ---")
+        if settings.CDC_ENABLED:
+            print("Aviso: o modo --years não publica deltas de CDC; a próxima carga completa ou incremental "
+                  "publica as alterações acumuladas.")
+        completed, failed = seasons.run_seasons(downloaded_file_paths, db_engine, year_range, workers)
+        if failed:
+            print(f"\nPipeline ETL concluído com falhas. Temporadas não carregadas: {', '.join(map(str, failed))}")
+        else:
+            print("\nPipeline ETL concluído com sucesso!")
+        metrics.finish_run()
+        return completed
 
-    # Carregar DataFrames transformados
-    # Note que agora chamamos as funções diretamente (ex: load_dataframe_to_db em vez de loader.load_dataframe_to_db)
-    load_dataframe_to_db(df_constructors_tf, settings.TABLE_NAMES["constructors"], db_engine)
-    load_dataframe_to_db(df_drivers_tf, settings.TABLE_NAMES["drivers"], db_engine)
-    load_dataframe_to_db(df_races_tf, settings.TABLE_NAMES["races"], db_engine)
-    load_dataframe_to_db(df_results_tf, settings.TABLE_NAMES["results"], db_engine, dtype_mapping=results_dtype_mapping)
+    # ETAPAS 2 e 3: TRANSFORMAÇÃO E CARGA (por conjunto de dados, conforme as dependências)
+    print("\n--- ETAPAS 2 e 3: TRANSFORMAÇÃO E CARGA NO BANCO DE DADOS ---")
+    tasks = run_dag(build_pipeline_tasks(downloaded_file_paths, db_engine, incremental_mode, stream_results))
+    print_summary(tasks)
 
-    print("\nPipeline ETL concluído com sucesso!")
+    failed = [task.name for task in tasks.values() if task.state != SUCCESS]
+    if failed:
+        print(f"\nPipeline ETL concluído com falhas. Tarefas não concluídas: {', '.join(failed)}")
+    else:
+        print("\nPipeline ETL concluído com sucesso!")
     print(f"Informações do Ambiente (conforme .env):")
     print(f"  Python Version: {settings.PYTHON_VERSION_USED}")
     print(f"  SGBD: {settings.SGBD_NAME_USED}")
     print(f"  SGBD Version: {settings.SGBD_VERSION_USED}")
+    metrics.finish_run()
+    return tasks
 
 if __name__ == "__main__":
-    run_etl_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pipeline ETL de dados da Fórmula 1.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Aplica apenas inserções/atualizações/remoções em vez de truncar e recarregar as tabelas.")
+    parser.add_argument("--stream-results", action="store_true",
+                        help="Lê, transforma e carrega results.csv em blocos; só as chaves e os fingerprints das linhas "
+                             "ficam em memória (apenas na carga completa).")
+    parser.add_argument("--check-stream-parity", action="store_true",
+                        help="Carrega os CSVs de extracao/ em memória e em blocos (em bancos SQLite temporários) "
+                             "e compara as tabelas; código de saída 1 se divergirem.")
+    parser.add_argument("--chunksize", type=int,
+                        help="Linhas por bloco de --stream-results e --check-stream-parity (padrão: STREAM_CHUNKSIZE).")
+    parser.add_argument("--years", metavar="INICIAL-FINAL",
+                        help="Reprocessa só as temporadas do intervalo (ex: 2023 ou 2010-2023; 'all' para todas), "
+                             "em paralelo por temporada, sem tocar nas demais.")
+    parser.add_argument("--workers", type=int,
+                        help="Processos de trabalho do modo --years (padrão: PIPELINE_MAX_PROCESSES ou um por núcleo).")
+    parser.add_argument("--extract-only", action="store_true",
+                        help="Só baixa/verifica os CSVs, sem transformar nem carregar (não importa pandas nem SQLAlchemy).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Grava um perfil cProfile por etapa em metrics/profiles/ (ver instrumentation/metrics.py).")
+    args = parser.parse_args()
+    if args.profile:
+        settings.METRICS_PROFILE = True
+    if args.check_stream_parity:
+        raise SystemExit(0 if check_stream_parity(chunksize=args.chunksize) else 1)
+    if args.chunksize:
+        settings.STREAM_CHUNKSIZE = args.chunksize
+    if args.incremental and args.stream_results:
+        print("Aviso: --stream-results não se aplica à carga incremental e será ignorado.")
+    year_range = None
+    if args.years:
+        from orchestration import seasons
+        year_range = seasons.parse_year_range(args.years)
+    if year_range is not None and (args.incremental or args.stream_results):
+        print("Aviso: --incremental e --stream-results não se aplicam ao modo --years e serão ignorados.")
+    run_etl_pipeline(incremental_mode=args.incremental, stream_results=args.stream_results,
+                     year_range=year_range, workers=args.workers, extract_only=args.extract_only)
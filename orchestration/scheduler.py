@@ -0,0 +1,108 @@
+# orchestration/scheduler.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import settings
+
+# Estados possíveis de uma tarefa
+PENDING = "pendente"
+RUNNING = "executando"
+SUCCESS = "sucesso"
+FAILED = "falhou"
+SKIPPED = "ignorada" # Alguma dependência falhou
+
+class Task:
+    """
+    Tarefa do pipeline: uma função e os nomes das tarefas das quais depende.
+    A função recebe um dicionário {nome_da_dependência: resultado} e seu retorno
+    fica disponível para as tarefas seguintes. Cada tarefa guarda o próprio estado,
+    erro e duração.
+    """
+
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+        self.state = PENDING
+        self.result = None
+        self.error = None
+        self.duration = None
+
+    def __repr__(self):
+        return f"Task({self.name!r}, estado={self.state!r})"
+
+def _validate(tasks):
+    """Garante que as dependências existem e que o grafo não tem ciclos."""
+    for task in tasks.values():
+        for dep in task.depends_on:
+            if dep not in tasks:
+                raise ValueError(f"Tarefa '{task.name}' depende de '{dep}', que não existe.")
+    visiting, done = set(), set()
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Ciclo de dependências envolvendo a tarefa '{name}'.")
+        visiting.add(name)
+        for dep in tasks[name].depends_on:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+    for name in tasks:
+        visit(name)
+
+def _run_task(task, inputs):
+    """Executa uma tarefa, registrando duração, resultado ou erro."""
+    start = time.perf_counter()
+    try:
+        task.result = task.func(inputs)
+        task.state = SUCCESS
+    except Exception as e:
+        task.error = e
+        task.state = FAILED
+    task.duration = time.perf_counter() - start
+    return task
+
+def run_dag(task_list, max_workers=None):
+    """
+    Executa as tarefas num pool de threads, cada uma assim que todas as suas dependências
+    terminarem com sucesso. Se uma tarefa falha, as que dependem dela (direta ou indiretamente)
+    são marcadas como ignoradas; as demais continuam normalmente.
+    Retorna o dicionário {nome: Task} com o estado final de cada tarefa.
+    """
+    if max_workers is None:
+        max_workers = settings.PIPELINE_MAX_WORKERS
+    tasks = {task.name: task for task in task_list}
+    _validate(tasks)
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            for task in tasks.values():
+                if task.state != PENDING:
+                    continue
+                dep_states = [tasks[dep].state for dep in task.depends_on]
+                if any(state in (FAILED, SKIPPED) for state in dep_states):
+                    task.state = SKIPPED
+                elif all(state == SUCCESS for state in dep_states):
+                    task.state = RUNNING
+                    inputs = {dep: tasks[dep].result for dep in task.depends_on}
+                    running[executor.submit(_run_task, task, inputs)] = task
+            if not running:
+                # Repete a varredura enquanto houver tarefas recém-ignoradas propagando o estado
+                if any(task.state == PENDING for task in tasks.values()):
+                    continue
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                running.pop(future)
+    return tasks
+
+def print_summary(tasks):
+    """Mostra o estado final, a duração e o erro (se houver) de cada tarefa."""
+    print("\nResumo das tarefas:")
+    for task in tasks.values():
+        duration = f"{task.duration:.2f}s" if task.duration is not None else "-"
+        line = f"  {task.name:<24} {task.state:<10} {duration:>8}"
+        if task.error is not None:
+            line += f"  erro: {task.error}"
+        print(line)
@@ -0,0 +1,190 @@
+# orchestration/seasons.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from config import settings
+from data_ingestion import reader
+from data_loading import incremental, loader, summaries
+from data_transformation import transformer
+from data_validation import validator
+from instrumentation import metrics
+
+# Tabelas particionadas por temporada (results segue a temporada da sua corrida) e tabelas compartilhadas
+SEASON_TABLES = ["races", "results"]
+DIMENSION_TABLES = ["constructors", "drivers"]
+
+# Remoção de uma temporada: results antes de races (chave estrangeira)
+DELETE_SEASON_QUERIES = [
+    'DELETE FROM results WHERE "raceId" IN (SELECT "raceId" FROM races WHERE year = :year)',
+    'DELETE FROM races WHERE year = :year',
+]
+
+def parse_year_range(value):
+    """
+    Converte o intervalo de temporadas da linha de comando em (inicial, final), inclusivo:
+    '2020-2023' -> (2020, 2023), '2023' -> (2023, 2023), 'all' -> (None, None) (todas).
+    """
+    if value.strip().lower() == "all":
+        return (None, None)
+    start, _, end = value.partition("-")
+    start, end = int(start), int(end or start)
+    if start > end:
+        raise ValueError(f"Intervalo de temporadas inválido: '{value}'.")
+    return (start, end)
+
+def _in_range(year, year_range):
+    start, end = year_range
+    return (start is None or year >= start) and (end is None or year <= end)
+
+def partition_by_season(races, results, year_range=(None, None)):
+    """
+    Divide races e results (brutos) por temporada: cada resultado vai para o ano da sua corrida
+    (junção por raceId com races.year, via índice hash). Só as temporadas do intervalo são mantidas.
+    Retorna ({ano: (races da temporada, results da temporada)}, linhas de results sem corrida).
+    """
+    if races.empty:
+        return {}, len(results)
+    positions = pd.Index(races["raceId"].to_numpy()).get_indexer(results["raceId"].to_numpy())
+    race_years = races["year"].to_numpy()
+    result_years = race_years[positions]
+    result_years[positions < 0] = -1 # Sem corrida correspondente: fora de qualquer temporada
+    race_groups = races.groupby(race_years).indices
+    result_groups = results.groupby(result_years).indices
+    partitions = {}
+    for year, race_positions in race_groups.items():
+        year = int(year)
+        if _in_range(year, year_range):
+            result_positions = result_groups.get(year, [])
+            partitions[year] = (races.iloc[race_positions], results.iloc[result_positions])
+    orphans = len(result_groups.get(-1, []))
+    return partitions, orphans
+
+def _settings_values():
+    """Configurações atuais (inclusive as alteradas em tempo de execução), para os processos de trabalho."""
+    return {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+
+def _init_worker(settings_values, run_id):
+    """Inicialização de cada processo de trabalho: mesmas configurações e mesma execução das métricas."""
+    for name, value in settings_values.items():
+        setattr(settings, name, value)
+    metrics.start_run(run_id)
+
+def process_season(year, raw_races, raw_results, parent_indexes, engine):
+    """
+    Transforma, valida e carrega uma temporada numa transação própria: remove do banco as corridas
+    do ano (e seus resultados), carrega as da temporada e recalcula as tabelas de resumo só desse ano.
+    As outras temporadas não são tocadas. Roda num processo de trabalho (ou no processo principal).
+    'engine' é a engine de run_seasons ou, num processo de trabalho, a sua URL (engines não são
+    serializáveis): a engine do processo é criada a partir dela por loader.get_db_engine.
+    Retorna {'year', 'rows', 'seconds'}.
+    """
+    start = time.perf_counter()
+    frames = {
+        "races": transformer.transform_races_df(raw_races),
+        "results": transformer.transform_results_df(raw_results),
+    }
+    if settings.VALIDATION_ENABLED:
+        frames, _ = validator.validate_frames(frames, SEASON_TABLES, parent_indexes)
+    defer_foreign_keys = settings.VALIDATION_ENABLED and settings.LOAD_DEFER_FOREIGN_KEYS
+    if not isinstance(engine, Engine):
+        engine = loader.get_db_engine(engine)
+    with loader.load_transaction(engine, defer_foreign_keys) as connection:
+        for query in DELETE_SEASON_QUERIES:
+            connection.execute(text(query), {"year": year})
+        for name in SEASON_TABLES:
+            dtype_mapping = loader.results_dtype_mapping if name == "results" else None
+            loader.load_dataframe_to_db(frames[name], settings.TABLE_NAMES[name], connection,
+                                        dtype_mapping=dtype_mapping, raise_errors=True)
+        summaries.refresh_summaries(connection, {year})
+    rows = sum(len(df) for df in frames.values())
+    return {"year": year, "rows": rows, "seconds": time.perf_counter() - start}
+
+def _load_dimensions(file_paths, engine):
+    """
+    Carrega constructors e drivers (compartilhados por todas as temporadas) por upsert, sem apagar
+    nada, e retorna os índices de suas chaves para a validação das chaves estrangeiras das temporadas.
+    """
+    frames = {}
+    for name in DIMENSION_TABLES:
+        frames[name] = transformer.transform_dataset(name, file_paths[name])
+    if settings.VALIDATION_ENABLED:
+        frames, _ = validator.validate_frames(frames, DIMENSION_TABLES)
+    with loader.load_transaction(engine) as connection:
+        for name in DIMENSION_TABLES:
+            incremental.upsert_rows(connection, frames[name], settings.TABLE_NAMES[name], settings.PRIMARY_KEYS[name])
+            print(f"Tabela '{settings.TABLE_NAMES[name]}': {len(frames[name])} linhas inseridas/atualizadas.")
+    return {name: validator.key_index(df, name) for name, df in frames.items()}
+
+def _seasons_in_db(engine, year_range):
+    """Temporadas do intervalo que já estão no banco (as que sumiram do CSV também são reprocessadas)."""
+    with engine.connect() as connection:
+        years = connection.execute(text("SELECT DISTINCT year FROM races")).scalars()
+        return {int(year) for year in years if year is not None and _in_range(int(year), year_range)}
+
+def run_seasons(file_paths, engine, year_range=(None, None), workers=None):
+    """
+    Executa o pipeline por temporada: constructors/drivers são atualizados uma vez e cada temporada
+    do intervalo (races + results do ano) é transformada e carregada em paralelo, em processos de
+    trabalho (até 'workers', padrão settings.PIPELINE_MAX_PROCESSES), cada uma numa transação própria.
+    No SQLite, que aceita um único escritor, as temporadas são processadas em sequência.
+    Retorna {ano: {'year', 'rows', 'seconds'}} das temporadas concluídas e a lista das que falharam.
+    """
+    if workers is None:
+        workers = settings.PIPELINE_MAX_PROCESSES or os.cpu_count() or 1
+    if engine.name == 'sqlite' and workers > 1:
+        print("SQLite aceita um único escritor por vez: temporadas processadas em sequência.")
+        workers = 1
+
+    parent_indexes = _load_dimensions(file_paths, engine)
+    races = reader.read_dataset("races", file_paths["races"])
+    results = reader.read_dataset("results", file_paths["results"])
+    partitions, orphans = partition_by_season(races, results, year_range)
+    if orphans:
+        print(f"Aviso: {orphans} linhas de results sem corrida correspondente em races ficaram fora das temporadas.")
+    # Temporadas do intervalo que estão no banco mas não no CSV: apenas removidas
+    for year in _seasons_in_db(engine, year_range) - set(partitions):
+        partitions[year] = (races.iloc[0:0], results.iloc[0:0])
+    del races, results
+    if not partitions:
+        print("Nenhuma temporada no intervalo informado.")
+        return {}, []
+
+    print(f"Processando {len(partitions)} temporada(s) com {workers} processo(s) de trabalho...")
+    start = time.perf_counter()
+    completed, failed = {}, []
+    if workers == 1:
+        for year in sorted(partitions):
+            try:
+                completed[year] = process_season(year, *partitions[year], parent_indexes, engine)
+            except Exception as e:
+                print(f"Erro na temporada {year}: {e}")
+                failed.append(year)
+    else:
+        # 'spawn': processos novos, sem herdar conexões abertas do processo principal
+        context = multiprocessing.get_context("spawn")
+        db_url = engine.url.render_as_string(hide_password=False) # str(url) mascara a senha
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(_settings_values(), metrics.current_run_id())) as executor:
+            futures = {executor.submit(process_season, year, *partitions[year], parent_indexes, db_url): year
+                       for year in sorted(partitions)}
+            for future in as_completed(futures):
+                year = futures[future]
+                try:
+                    completed[year] = future.result()
+                except Exception as e:
+                    print(f"Erro na temporada {year}: {e}")
+                    failed.append(year)
+
+    elapsed = time.perf_counter() - start
+    total_rows = sum(stats["rows"] for stats in completed.values())
+    rows_per_sec = total_rows / elapsed if elapsed > 0 else float('inf')
+    print(f"{len(completed)} temporada(s) carregada(s) em {elapsed:.2f}s ({total_rows} linhas, {rows_per_sec:,.0f} linhas/s).")
+    # O banco deixou de corresponder aos snapshots da carga incremental: a próxima execução
+    # incremental reconcilia as tabelas por completo
+    for name in settings.LOAD_ORDER:
+        incremental.clear_snapshot(settings.TABLE_NAMES[name], engine)
+    return completed, sorted(failed)
@@ -0,0 +1,31 @@
+-- sql_scripts/create_summary_tables.sql
+
+-- Versões materializadas das views de create_views.sql, mantidas pelo pipeline
+-- (data_loading/summaries.py). Cada carga recalcula apenas os anos afetados;
+-- os painéis consultam estas tabelas por índice em vez de refazer junções e agregações.
+
+DROP TABLE IF EXISTS summary_driver_yearly_results;
+DROP TABLE IF EXISTS summary_grand_prix_fastest_laps;
+
+-- Resumo de view_driver_yearly_results
+CREATE TABLE summary_driver_yearly_results (
+    ano INT NOT NULL,
+    driver_fullname TEXT,
+    constructor_name TEXT,
+    qtd_vitorias INT,
+    qtd_pontos INT
+);
+CREATE INDEX idx_summary_driver_yearly_results_ano ON summary_driver_yearly_results (ano);
+
+-- Resumo de view_grand_prix_fastest_laps (uma linha por corrida)
+CREATE TABLE summary_grand_prix_fastest_laps (
+    "raceId" INT PRIMARY KEY,
+    ano INT NOT NULL,
+    race_date DATE,
+    grand_prix_name TEXT,
+    fastest_lap_time TIME,
+    driver_fullname TEXT,
+    constructor_name TEXT
+);
+CREATE INDEX idx_summary_grand_prix_fastest_laps_ano ON summary_grand_prix_fastest_laps (ano);
+CREATE INDEX idx_summary_grand_prix_fastest_laps_date ON summary_grand_prix_fastest_laps (race_date);
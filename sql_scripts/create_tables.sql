@@ -31,7 +31,15 @@ CREATE TABLE results (
     "positionOrder" INT,
     points INT,
     "fastestLapTime" TIME,
-    FOREIGN KEY ("raceId") REFERENCES races("raceId"),
-    FOREIGN KEY ("driverId") REFERENCES drivers("driverId"),
-    FOREIGN KEY ("constructorId") REFERENCES constructors("constructorId")
-);
\ No newline at end of file
+    "fastestLapTimeMs" INT,
+    -- DEFERRABLE: a carga de dados já validados adia a verificação para o commit (SET CONSTRAINTS ALL DEFERRED)
+    FOREIGN KEY ("raceId") REFERENCES races("raceId") DEFERRABLE INITIALLY IMMEDIATE,
+    FOREIGN KEY ("driverId") REFERENCES drivers("driverId") DEFERRABLE INITIALLY IMMEDIATE,
+    FOREIGN KEY ("constructorId") REFERENCES constructors("constructorId") DEFERRABLE INITIALLY IMMEDIATE
+);
+
+-- Índices de apoio às junções e filtros das views e das tabelas de resumo
+CREATE INDEX idx_results_race_id ON results ("raceId");
+CREATE INDEX idx_results_driver_id ON results ("driverId");
+CREATE INDEX idx_results_constructor_id ON results ("constructorId");
+CREATE INDEX idx_races_year ON races (year);
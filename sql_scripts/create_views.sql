@@ -36,7 +36,8 @@ WITH ranked_laps AS (
         re."fastestLapTime" AS fastest_lap_time,
         d.fullname AS driver_fullname,
         c.name AS constructor_name,
-        ROW_NUMBER() OVER (PARTITION BY ra."raceId" ORDER BY re."fastestLapTime" ASC) as rn
+        -- Ordena pelo tempo em milissegundos (inteiro), sem comparar valores TIME
+        ROW_NUMBER() OVER (PARTITION BY ra."raceId" ORDER BY re."fastestLapTimeMs" ASC) as rn
     FROM
         results re
     -- Usar aspas duplas nas colunas da junção (JOIN)
@@ -47,7 +48,7 @@ WITH ranked_laps AS (
     JOIN
         constructors c ON re."constructorId" = c."constructorId"
     WHERE
-        re."fastestLapTime" IS NOT NULL
+        re."fastestLapTimeMs" IS NOT NULL
 )
 SELECT
     race_date,